@@ -1,7 +1,7 @@
-import random, os
+import os
 from flask import Flask, jsonify, request
 from db.db_operations import find_documents, insert_document, delete_documents
-from utils.auth import send_email
+from utils.two_factor import TwoFactorError, send_code, verify_code
 from itsdangerous import URLSafeTimedSerializer
 from register.email_confirm import (
     confirm_token,
@@ -46,6 +46,9 @@ def confirm_registration(token):
     log_data = log_data[0]
     del user_data["_id"]
     del log_data["_id"]
+    # Confirmed documents must not carry the pending TTL field along.
+    user_data.pop("created_at", None)
+    log_data.pop("created_at", None)
 
     # Move user data to "users" collection
     try:
@@ -100,17 +103,12 @@ def send_2fa():
     if not email:
         return jsonify({"success": False, "message": "Email is required"}), 400
 
-    code = random.randint(100000, 999999)
+    # The code stays on the server; the client only ever sees it by email.
     try:
-        # Send the 2FA code via email
-        send_email(
-            to_email=email,
-            subject="Your 2FA Code",
-            body=f"Your 2FA code is {code}. Please enter it to complete the login process.",
-        )
-        return jsonify(
-            {"success": True, "message": "2FA code sent successfully", "code": code}
-        )
+        send_code(email)
+        return jsonify({"success": True, "message": "2FA code sent successfully"})
+    except TwoFactorError as e:
+        return jsonify({"success": False, "message": str(e)}), 429
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
@@ -118,24 +116,20 @@ def send_2fa():
 @app.route("/verify-2fa", methods=["POST"])
 def verify_2fa():
     data = request.json
+    email = data.get("email")
     code = data.get("code")
-    expected_code = data.get("expected_code")
 
-    if not code or not expected_code:
+    if not email or not code:
         return (
-            jsonify(
-                {
-                    "success": False,
-                    "message": "Both code and expected_code are required",
-                }
-            ),
+            jsonify({"success": False, "message": "Both email and code are required"}),
             400,
         )
 
-    if str(code) == str(expected_code):
-        return jsonify({"success": True, "message": "2FA code verified"})
+    ok, message = verify_code(email, code)
+    if ok:
+        return jsonify({"success": True, "message": message})
     else:
-        return jsonify({"success": False, "message": "Invalid 2FA code"}), 401
+        return jsonify({"success": False, "message": message}), 401
 
 
 if __name__ == "__main__":
@@ -1,10 +1,15 @@
 import os
+import atexit
 import logging
-from pymongo import MongoClient
+import threading
+from importlib.util import find_spec
+from bson.binary import UuidRepresentation
+from bson.codec_options import CodecOptions
+from pymongo import MongoClient, WriteConcern
+from pymongo.errors import PyMongoError
 from dotenv import load_dotenv
 from utils.helpers import reset, green, red
 
-
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
@@ -21,37 +26,157 @@ MONGO_COLLECTIONS = {
     "pending_log": os.getenv("MONGO_PENDING_LOG"),
 }
 
+# Client settings, all overridable from the environment.
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000)),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SELECTION_TIMEOUT_MS", 5000)),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000)),
+    "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+    "compressors": os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib"),
+}
+
+# Write concern for the high-volume login logs, which only need an
+# acknowledged write. Applied only when the URI sets no write concern of
+# its own; MONGO_LOG_W="" keeps the client's default for them too.
+MONGO_LOG_W = os.getenv("MONGO_LOG_W", "1")
+
+# Options for every collection handle, plus per-key overrides.
+COLLECTION_DEFAULTS = {
+    "codec_options": CodecOptions(uuid_representation=UuidRepresentation.STANDARD),
+}
+_log_w = int(MONGO_LOG_W) if MONGO_LOG_W.isdigit() else MONGO_LOG_W
+_LOG_OPTIONS = {"write_concern": WriteConcern(w=_log_w)} if MONGO_LOG_W else {}
+COLLECTION_OPTIONS = {
+    "admin_log": _LOG_OPTIONS,
+    "user_log": _LOG_OPTIONS,
+    "pending_log": _LOG_OPTIONS,
+}
+
+# Compressor -> modules that provide it; zlib ships with Python.
+_COMPRESSOR_MODULES = {
+    "zstd": ("zstandard", "backports.zstd", "compression.zstd"),
+    "snappy": ("snappy",),
+    "zlib": ("zlib",),
+}
+
 # Setup logger
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-# Establish connection with try, catch improvement.
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[MONGO_DBNAME]
-    logger.info(green + f"Connected to database: {db.name}{reset}")
-except Exception as e:
-    logger.error(red + f"Failed to connect to MongoDB: {e}{reset}")
+# One client per process, created on first use (MongoClient is not fork-safe,
+# so a forked child builds its own).
+_client = None
+_client_pid = None
+_client_overrides = {}
+_client_lock = threading.Lock()
+# Collection handles by logical key, built once per client.
+_collections = {}
+
+
+def _installed(module):
+    try:
+        return find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def available_compressors(names):
+    # Drop compressors whose module is missing instead of warning on connect.
+    wanted = [name.strip() for name in names.split(",") if name.strip()]
+    return [
+        name
+        for name in wanted
+        if any(_installed(module) for module in _COMPRESSOR_MODULES.get(name, ()))
+    ]
+
+
+def get_client(**overrides):
+    # overrides only shape the client when it is created; asking for
+    # different ones later is an error rather than silently ignored.
+    global _client, _client_pid, _client_overrides
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                options = {**MONGO_CLIENT_OPTIONS, **overrides}
+                compressors = available_compressors(options.pop("compressors", ""))
+                if compressors:
+                    options["compressors"] = compressors
+                _client = MongoClient(MONGO_URI, **options)
+                _client_pid = os.getpid()
+                _client_overrides = overrides
+                _collections.clear()
+                logger.info(
+                    green
+                    + f"MongoDB client ready (pool {options['maxPoolSize']}, "
+                    + f"compression {compressors or 'off'}){reset}"
+                )
+    if overrides and overrides != _client_overrides:
+        raise ValueError(
+            f"MongoDB client already created with {_client_overrides or 'defaults'};"
+            " call close_client() before asking for different options"
+        )
+    return _client
+
+
+def get_db():
+    try:
+        return get_client()[MONGO_DBNAME]
+    except Exception as e:
+        logger.error(red + f"Failed to connect to MongoDB: {e}{reset}")
+        return None
+
+
+def ping():
+    # Health check: True if the server answers within the selection timeout.
+    try:
+        get_client().admin.command("ping")
+        return True
+    except (PyMongoError, TypeError, ValueError) as e:
+        logger.error(red + f"MongoDB ping failed: {e}{reset}")
+        return False
+
+
+def close_client():
+    global _client, _client_pid, _client_overrides
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+            _client_pid = None
+            _client_overrides = {}
+            _collections.clear()
+
+
+atexit.register(close_client)
 
 
 def get_collection(collection_key: str):
+    # Resolves a logical key ("users", "user_log", ...) to a cached handle.
+    collection = _collections.get(collection_key)
+    if collection is not None and _client_pid == os.getpid():
+        return collection
+
     collection_name = MONGO_COLLECTIONS.get(collection_key)
     if not collection_name:
         logger.error(red + f"Collection key '{collection_key}' not found." + reset)
         return None
 
+    db = get_db()
     if db is None:
         logger.error(red + "Database connection is not established." + reset)
         return None
 
-    collection = db[collection_name]
-
-    if collection is None:
-        logger.error(
-            red + f"Collection '{collection_name}' not found in database." + reset
-        )
-        return None
-
+    options = {**COLLECTION_DEFAULTS, **COLLECTION_OPTIONS.get(collection_key, {})}
+    if "write_concern" in options and not db.write_concern.is_server_default:
+        # A write concern configured on the client (e.g. w=majority in the
+        # URI) wins over the relaxed one for logs.
+        del options["write_concern"]
+    collection = db.get_collection(collection_name, **options)
+    _collections[collection_key] = collection
     return collection
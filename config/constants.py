@@ -0,0 +1,5 @@
+# Settings shared by the app and the db tooling. Plain values only: no
+# environment or secrets are read here, so anything can import it.
+
+# Seconds a confirmation link stays valid; pending registrations expire with it.
+TOKEN_EXPIRATION = 600
@@ -1,11 +1,11 @@
 # CRUD operations for dynamic use.
 
 import logging
-from pymongo.errors import PyMongoError
-from config.connect_db import get_collection, MONGO_COLLECTIONS
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+from config.connect_db import get_collection
 from utils.helpers import green, blue, red, reset
 
-
 # Setup logger
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -13,15 +13,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _collection(collection_key: str):
+    collection = get_collection(collection_key)
+    if collection is None:
+        raise ValueError(f"Invalid collection key: {collection_key}")
+    return collection
+
+
 def insert_document(collection_key: str, document: dict):
     try:
-        collection_name = MONGO_COLLECTIONS.get(collection_key)
-        if not collection_name:
-            raise ValueError(f"Invalid collection key: {collection_key}")
-        collection = get_collection(collection_name)
-
-        if collection is None:
-            raise ValueError(f"Collection '{collection_name}' not found.")
+        collection = _collection(collection_key)
+        collection_name = collection.name
 
         result = collection.insert_one(document)
         if result.inserted_id:
@@ -36,17 +38,39 @@ def insert_document(collection_key: str, document: dict):
         )
 
 
+def insert_documents(collection_key: str, documents: list, ordered: bool = True):
+    # One bulk round-trip; unordered inserts keep going past duplicates.
+    # Returns the number of documents inserted.
+    try:
+        collection = _collection(collection_key)
+        result = collection.insert_many(documents, ordered=ordered)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        logger.warning(
+            blue + f"{len(errors)} document(s) rejected by {collection_key}" + reset
+        )
+        return e.details.get("nInserted", 0)
+    except Exception as e:
+        logger.error(
+            red + f"Error inserting documents into {collection_key}: {e}" + reset
+        )
+        return 0
+
+
 def find_documents(
-    collection_key: str, query: dict = None, limit: int = 0, sort_by: tuple = None
+    collection_key: str,
+    query: dict = None,
+    limit: int = 0,
+    sort_by: tuple = None,
+    projection: dict = None,
 ):
 
     try:
-        collection_name = MONGO_COLLECTIONS.get(collection_key)
-        if not collection_name:
-            raise ValueError(f"Invalid collection key: {collection_key}")
-        collection = get_collection(collection_name)
+        collection = _collection(collection_key)
+        collection_name = collection.name
         query = query or {}
-        cursor = collection.find(query)
+        cursor = collection.find(query, projection)
 
         if sort_by:
             cursor = cursor.sort(sort_by)
@@ -74,29 +98,116 @@ def find_documents(
         return []
 
 
+def find_one_document(
+    collection_key: str, query: dict, projection: dict = None, sort_by: tuple = None
+):
+    # Single document (or None), with only the projected fields on the wire.
+    try:
+        collection = _collection(collection_key)
+        return collection.find_one(query, projection, sort=sort_by)
+    except PyMongoError as e:
+        logger.error(
+            red + f"Failed to retrieve a document from {collection_key}: {e}" + reset
+        )
+        return None
+    except Exception as e:
+        logger.error(
+            red
+            + f"Unexpected error retrieving a document from {collection_key}: {e}"
+            + reset
+        )
+        return None
+
+
+def document_exists(collection_key: str, query: dict):
+    # Stops at the first match and returns no document body at all.
+    try:
+        collection = _collection(collection_key)
+        return collection.count_documents(query, limit=1) > 0
+    except PyMongoError as e:
+        logger.error(red + f"Failed to query {collection_key}: {e}" + reset)
+        return False
+    except Exception as e:
+        logger.error(red + f"Unexpected error querying {collection_key}: {e}" + reset)
+        return False
+
+
+def iter_documents(
+    collection_key: str,
+    query: dict = None,
+    projection: dict = None,
+    sort_by: tuple = None,
+    limit: int = 0,
+    batch_size: int = 500,
+):
+    # Streams documents batch by batch instead of loading the whole result.
+    # The cursor is closed when the generator finishes or is closed.
+    try:
+        collection = _collection(collection_key)
+        cursor = collection.find(query or {}, projection).batch_size(batch_size)
+        if sort_by:
+            cursor = cursor.sort(sort_by)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        with cursor:
+            yield from cursor
+    except PyMongoError as e:
+        logger.error(
+            red + f"Failed to stream documents from {collection_key}: {e}" + reset
+        )
+    except Exception as e:
+        logger.error(
+            red
+            + f"Unexpected error streaming documents from {collection_key}: {e}"
+            + reset
+        )
+
+
+def distinct_values(collection_key: str, field: str, query: dict = None):
+    # Distinct values of field, or None when the read failed, so callers
+    # can tell a failure apart from an empty collection.
+    try:
+        return _collection(collection_key).distinct(field, query or {})
+    except PyMongoError as e:
+        logger.error(
+            red + f"Failed to read {field} values from {collection_key}: {e}" + reset
+        )
+        return None
+    except Exception as e:
+        logger.error(
+            red
+            + f"Unexpected error reading {field} values from {collection_key}: {e}"
+            + reset
+        )
+        return None
+
+
 def update_documents(
-    collection_key: str, query: dict, update_data: dict, multiple: bool = False
+    collection_key: str,
+    query: dict,
+    update_data: dict,
+    multiple: bool = False,
+    upsert: bool = False,
 ):
 
     try:
-        collection_name = MONGO_COLLECTIONS.get(collection_key)
-        if not collection_name:
-            raise ValueError(f"Invalid collection key: {collection_key}")
-        collection = get_collection(collection_name)
-        if "$set" not in update_data:
+        collection = _collection(collection_key)
+        collection_name = collection.name
+        # Plain fields are a $set; operator documents ($push, ...) pass through.
+        if not any(key.startswith("$") for key in update_data):
             update_data = {"$set": update_data}
 
         result = (
-            collection.update_many(query, update_data)
+            collection.update_many(query, update_data, upsert=upsert)
             if multiple
-            else collection.update_one(query, update_data)
+            else collection.update_one(query, update_data, upsert=upsert)
         )
+        changed = result.modified_count + (result.upserted_id is not None)
         logger.info(
-            green
-            + f"Updated: {result.modified_count} document(s) in {collection_name}"
-            + reset
+            green + f"Updated: {changed} document(s) in {collection_name}" + reset
         )
-        return result.modified_count
+        return changed
     except PyMongoError as e:
         logger.error(
             red + f"Failed to update documents in {collection_key}: {e}" + reset
@@ -111,12 +222,37 @@ def update_documents(
         return 0
 
 
+def update_one_document(
+    collection_key: str, query: dict, update_data: dict, projection: dict = None
+):
+    # Atomic find_one_and_update: the document as it is after the update,
+    # or None when nothing matched (or the update failed).
+    try:
+        collection = _collection(collection_key)
+        return collection.find_one_and_update(
+            query,
+            update_data,
+            projection,
+            return_document=ReturnDocument.AFTER,
+        )
+    except PyMongoError as e:
+        logger.error(
+            red + f"Failed to update a document in {collection_key}: {e}" + reset
+        )
+        return None
+    except Exception as e:
+        logger.error(
+            red
+            + f"Unexpected error updating a document in {collection_key}: {e}"
+            + reset
+        )
+        return None
+
+
 def delete_documents(collection_key: str, query: dict, multiple: bool = False):
     try:
-        collection_name = MONGO_COLLECTIONS.get(collection_key)
-        if not collection_name:
-            raise ValueError(f"Invalid collection key: {collection_key}")
-        collection = get_collection(collection_name)
+        collection = _collection(collection_key)
+        collection_name = collection.name
         result = (
             collection.delete_many(query) if multiple else collection.delete_one(query)
         )
@@ -0,0 +1,120 @@
+# Index bootstrap for every collection: python -m db.indexes
+# Safe to rerun; existing indexes with the same spec are left alone.
+import argparse
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+from config.connect_db import MONGO_COLLECTIONS, get_collection
+from config.constants import TOKEN_EXPIRATION
+from utils.helpers import green, red, blue, yellow, reset
+
+# Logical collection key -> indexes the code relies on.
+INDEXES = {
+    "admin": [IndexModel([("name", ASCENDING)], name="name_unique", unique=True)],
+    "users": [IndexModel([("email", ASCENDING)], name="email_unique", unique=True)],
+    "user_log": [IndexModel([("email", ASCENDING)], name="email_unique", unique=True)],
+    "admin_log": [IndexModel([("name", ASCENDING)], name="name")],
+    "pending_users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # Unconfirmed registrations go away when their link expires.
+        IndexModel(
+            [("created_at", ASCENDING)],
+            name="created_at_ttl",
+            expireAfterSeconds=TOKEN_EXPIRATION,
+        ),
+    ],
+    "pending_log": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel(
+            [("created_at", ASCENDING)],
+            name="created_at_ttl",
+            expireAfterSeconds=TOKEN_EXPIRATION,
+        ),
+    ],
+    "highscore": [IndexModel([("score", DESCENDING)], name="score_desc")],
+}
+
+
+def ensure_indexes(keys=None, unique=None):
+    # Returns the number of collections whose indexes could not be built.
+    # unique=True builds only the unique indexes, unique=False only the rest.
+    failed = 0
+    for key in keys or INDEXES:
+        models = [
+            model
+            for model in INDEXES.get(key, [])
+            if unique is None or model.document.get("unique", False) == unique
+        ]
+        if not models:
+            continue
+        collection = get_collection(key)
+        if collection is None:
+            failed += 1
+            continue
+        try:
+            names = collection.create_indexes(models)
+            print(green + f"{collection.name}: {', '.join(names)}" + reset)
+        except OperationFailure as e:
+            # Usually duplicates under a new unique index or a changed spec.
+            failed += 1
+            print(
+                red + f"{collection.name}: {(e.details or {}).get('errmsg', e)}" + reset
+            )
+        except PyMongoError as e:
+            failed += 1
+            print(red + f"{collection.name}: {e}" + reset)
+    return failed
+
+
+def index_usage(keys=None):
+    # Yields (collection, index, ops, since) from $indexStats.
+    for key in keys or MONGO_COLLECTIONS:
+        collection = get_collection(key)
+        if collection is None:
+            continue
+        try:
+            stats = list(collection.aggregate([{"$indexStats": {}}]))
+        except PyMongoError as e:
+            print(red + f"{collection.name}: no index stats ({e})" + reset)
+            continue
+        for stat in sorted(stats, key=lambda s: s["name"]):
+            access = stat.get("accesses", {})
+            yield collection.name, stat["name"], access.get("ops", 0), access.get(
+                "since"
+            )
+
+
+def print_usage(keys=None):
+    print(yellow + f"\n{'collection':<20}{'index':<20}{'ops':>12}  since" + reset)
+    for collection, index, ops, since in index_usage(keys):
+        since = since.strftime("%Y-%m-%d %H:%M") if since else "-"
+        print(f"{collection:<20}{index:<20}{ops:>12,}  {since}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m db.indexes",
+        description="Create the indexes the app relies on and report their usage.",
+    )
+    parser.add_argument(
+        "--collection",
+        action="append",
+        choices=list(INDEXES),
+        help="only this collection, repeatable (default: all)",
+    )
+    parser.add_argument(
+        "--stats-only", action="store_true", help="report usage, create nothing"
+    )
+    args = parser.parse_args(argv)
+
+    failed = 0
+    if not args.stats_only:
+        print(blue + "Creating indexes..." + reset)
+        failed = ensure_indexes(args.collection)
+        if failed:
+            print(red + "Some indexes could not be created." + reset)
+    print_usage(args.collection)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+# Streaming readers for JSON data files, shared by the seeder and the user
+# import tool: a top-level array is parsed one element at a time and NDJSON
+# one line at a time, so large files are never loaded whole.
+import json
+import re
+from pathlib import Path
+from bson import json_util
+from utils.helpers import red, reset
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = re.compile(r"[\s,]*")
+
+
+def _iter_json(file, chunk_size=CHUNK_SIZE):
+    # Incremental parse of a top-level JSON array, one element at a time,
+    # so the file is never loaded whole. A single object yields itself.
+    # Extended JSON ({"$date": ...}, {"$oid": ...}) decodes to BSON types.
+    decoder = json.JSONDecoder(object_hook=json_util.object_hook)
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        data = decoder.decode(buffer + file.read()) if buffer else []
+        yield from data if isinstance(data, list) else [data]
+        return
+
+    position, eof = 1, False
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            document, end = decoder.raw_decode(buffer, position)
+            # A value touching the end of the buffer may be cut short.
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError("Truncated", buffer, end)
+        except json.JSONDecodeError:
+            more = file.read(chunk_size)
+            if not more:
+                if eof:
+                    raise
+                eof = True
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield document
+        position = end
+
+
+def _iter_ndjson(file):
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line, object_hook=json_util.object_hook)
+
+
+def load_json(file_path: Path):
+    # Generator over the documents in a .json array or an NDJSON file.
+    if not file_path.exists():
+        print(red + f"File {file_path} does not exists!" + reset)
+        return
+    with open(file_path, "r") as file:
+        try:
+            if file_path.suffix in (".ndjson", ".jsonl"):
+                yield from _iter_ndjson(file)
+            else:
+                yield from _iter_json(file)
+        except json.JSONDecodeError as e:
+            print(red + f"Error decoding JSON from {file_path} : {e}" + reset)
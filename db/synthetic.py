@@ -0,0 +1,293 @@
+# Synthetic datasets for local benchmarks: python -m db.synthetic --help
+# Writes one NDJSON file per collection that seeder.py loads directly:
+#   python -m db.synthetic --users 1e6 --out data/synthetic
+#   python seeder.py --data data/synthetic
+import argparse
+import base64
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import bcrypt
+from config.constants import TOKEN_EXPIRATION
+from utils.helpers import green, blue, yellow, reset
+from utils.system_info import FINGERPRINT_VERSION
+
+FIRST_NAMES = [
+    "Emma", "Liam", "Olivia", "Noah", "Ava", "Lucas", "Mia", "Daan", "Sophie",
+    "Sem", "Julia", "Finn", "Tess", "Milan", "Zoe", "Levi", "Sara", "Luuk",
+    "Anna", "Jesse", "Nora", "Thijs", "Eva", "Bram", "Lotte", "Max", "Isa",
+    "Ruben", "Fleur", "Lars", "Jane", "Jordy", "Yara", "Hugo", "Lina", "Omar",
+]  # fmt: skip
+LAST_NAMES = [
+    "de Jong", "Jansen", "de Vries", "van den Berg", "Bakker", "Visser", "Smit",
+    "Meijer", "Mulder", "de Boer", "Bos", "Vos", "Peters", "Hendriks", "Dekker",
+    "Smith", "Johnson", "Brown", "Garcia", "Miller", "Davis", "Martin", "Lopez",
+    "Wilson", "Moore", "Taylor", "Clark", "Lewis", "Walker", "Young", "King",
+]  # fmt: skip
+DOMAINS = ["gmail.com", "outlook.com", "hotmail.com", "yahoo.com", "proton.me"]
+# (latitude, longitude) of the places logins come from.
+CITIES = [
+    (52.3676, 4.9041), (51.9244, 4.4777), (52.0907, 5.1214), (51.4416, 5.4697),
+    (53.2194, 6.5665), (50.8503, 4.3517), (51.5074, -0.1278), (48.8566, 2.3522),
+    (52.5200, 13.4050), (40.4168, -3.7038), (41.9028, 12.4964), (40.7128, -74.006),
+    (34.0522, -118.2437), (35.6762, 139.6503), (-33.8688, 151.2093),
+]  # fmt: skip
+DRIVE_MODELS = ["nvme0n1", "sda", "sdb", "Samsung SSD 980", "WDC WD10EZEX"]
+
+COLLECTIONS = ("users", "user_log", "pending_users", "pending_log", "highscore")
+HISTORY_DAYS = 90
+MAX_LOGINS = 5  # log_login_time keeps the last five
+
+_BCRYPT_ALPHABET = bytes.maketrans(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+    b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+)
+
+
+def _person(index, pending=False):
+    # Name and email follow from the index alone, so users, logs and
+    # highscores agree without sharing any state.
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[index // len(FIRST_NAMES) % len(LAST_NAMES)]
+    local = f"{first}.{last}".lower().replace(" ", "")
+    tag = "pending" if pending else ""
+    return first, last, f"{local}.{tag}{index}@{DOMAINS[index % len(DOMAINS)]}"
+
+
+def _password_hash(password, cost, rng):
+    # bcrypt with a salt drawn from rng, so a seed gives the same hash.
+    salt = base64.b64encode(rng.randbytes(16))[:22].translate(_BCRYPT_ALPHABET)
+    return bcrypt.hashpw(password.encode(), b"$2b$%02d$" % cost + salt).decode()
+
+
+def _mac(rng):
+    return ":".join(f"{rng.randrange(256):02x}" for _ in range(6))
+
+
+def _device(rng):
+    return {
+        "mac_addresses": sorted(_mac(rng) for _ in range(rng.randint(1, 3))),
+        "drives": [
+            {
+                "model": rng.choice(DRIVE_MODELS),
+                "serial": f"{rng.getrandbits(48):012X}",
+            }
+        ],
+        "motherboard_serial": f"MB{rng.getrandbits(40):010X}",
+        "fingerprint_version": FINGERPRINT_VERSION,
+    }
+
+
+def _location(rng):
+    latitude, longitude = rng.choice(CITIES)
+    return (
+        f"{latitude + rng.uniform(-0.05, 0.05):.4f}",
+        f"{longitude + rng.uniform(-0.05, 0.05):.4f}",
+    )
+
+
+def _date(moment):
+    # Extended JSON, so the seeder stores a real date (the TTL index needs one).
+    return {"$date": moment.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"}
+
+
+def users(count, rng, now, password_hash):
+    for index in range(count):
+        first, last, email = _person(index)
+        yield {
+            "name": first,
+            "surname": last,
+            "email": email,
+            "phone": f"06{rng.randrange(10**8):08d}",
+            "password": password_hash,
+            "sec_password": password_hash,
+            "role": "user",
+            "2fa_method": "email" if rng.random() < 0.7 else "none",
+            "login_attempts": 0,
+        }
+
+
+def user_log(count, rng, now, password_hash):
+    for index in range(count):
+        device = _device(rng)
+        latitude, longitude = _location(rng)
+        # Most users always log in from the same place on the same machine.
+        seconds = sorted(
+            rng.randrange(HISTORY_DAYS * 86400)
+            for _ in range(rng.randint(0, MAX_LOGINS))
+        )
+        login_times = []
+        for offset in reversed(seconds):
+            if rng.random() < 0.1:
+                latitude, longitude = _location(rng)
+            moment = now - timedelta(seconds=offset)
+            login_times.append(
+                {
+                    "time": moment.strftime("%Y-%m-%d %H:%M:%S UTC"),
+                    "system_info": {
+                        **device,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                    },
+                }
+            )
+        log = {
+            "email": _person(index)[2],
+            "location": f"{latitude}, {longitude}",
+            "mac_address": device["mac_addresses"],
+            "login_times": login_times,
+        }
+        if login_times:
+            # log_login_time keeps the latest system info at the top level too.
+            log["system_info"] = login_times[-1]["system_info"]
+        yield log
+
+
+def pending_users(count, rng, now, password_hash):
+    for index in range(count):
+        first, last, email = _person(index, pending=True)
+        yield {
+            "name": first,
+            "surname": last,
+            "email": email,
+            "phone": f"06{rng.randrange(10**8):08d}",
+            "password": password_hash,
+            "sec_password": password_hash,
+            "role": "user",
+            "token": f"{rng.getrandbits(256):064x}",
+            # Spread over the link lifetime, so they expire gradually.
+            "created_at": _date(
+                now - timedelta(seconds=rng.uniform(0, TOKEN_EXPIRATION))
+            ),
+        }
+
+
+def pending_log(count, rng, now, password_hash):
+    for index in range(count):
+        latitude, longitude = _location(rng)
+        yield {
+            "email": _person(index, pending=True)[2],
+            "location": f"{latitude}, {longitude}",
+            "mac_address": [_mac(rng)],
+            "created_at": _date(now - timedelta(seconds=rng.uniform(0, 60))),
+        }
+
+
+def highscore(count, rng, now, password_hash, players=1):
+    # Several scores per player; chip counts are long-tailed.
+    for _ in range(count):
+        first, _, email = _person(rng.randrange(players))
+        moment = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+        yield {
+            "name": first,
+            "email": email,
+            "score": int(rng.lognormvariate(5.5, 1.0)),
+            "time": moment.strftime("%Y-%m-%d %H:%M:%S UTC"),
+        }
+
+
+GENERATORS = {
+    "users": users,
+    "user_log": user_log,
+    "pending_users": pending_users,
+    "pending_log": pending_log,
+    "highscore": highscore,
+}
+
+
+def write_collection(key, count, out, seed, now, password, cost, players):
+    # Each collection draws from its own stream, so output does not depend
+    # on which collections are generated or in what order.
+    rng = random.Random(f"{seed}:{key}")
+    password_hash = _password_hash(password, cost, random.Random(f"{seed}:password"))
+    extra = {"players": players} if key == "highscore" else {}
+    documents = GENERATORS[key](count, rng, now, password_hash, **extra)
+
+    path = Path(out) / f"{key}.ndjson"
+    started = time.perf_counter()
+    encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as file:
+        for document in documents:
+            file.write(encode(document))
+            file.write("\n")
+    return key, count, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m db.synthetic",
+        description="Generate production-sized NDJSON datasets for seeder.py.",
+    )
+    parser.add_argument("--users", type=float, default=1e4, help="e.g. 1e4 .. 5e7")
+    parser.add_argument(
+        "--pending", type=float, default=None, help="default: 1%% of users"
+    )
+    parser.add_argument(
+        "--scores", type=float, default=None, help="default: half the users"
+    )
+    parser.add_argument("--out", type=Path, default=Path("data/synthetic"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--now",
+        type=datetime.fromisoformat,
+        default=None,
+        help="anchor for all timestamps (ISO); fix it for byte-identical output",
+    )
+    parser.add_argument(
+        "--password", default="Blackjack1!", help="password of every account"
+    )
+    parser.add_argument("--cost", type=int, default=12, help="bcrypt cost")
+    parser.add_argument(
+        "--collection", action="append", choices=COLLECTIONS, help="repeatable"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    user_count = int(args.users)
+    counts = {
+        "users": user_count,
+        "user_log": user_count,
+        "pending_users": int(
+            args.pending if args.pending is not None else user_count // 100
+        ),
+        "highscore": int(args.scores if args.scores is not None else user_count // 2),
+    }
+    counts["pending_log"] = counts["pending_users"]
+    now = args.now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    keys = args.collection or list(COLLECTIONS)
+    print(blue + f"Generating {', '.join(keys)} into {args.out}..." + reset)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = [
+            pool.submit(
+                write_collection,
+                key,
+                counts[key],
+                args.out,
+                args.seed,
+                now,
+                args.password,
+                args.cost,
+                max(user_count, 1),
+            )
+            for key in keys
+        ]
+        for job in jobs:
+            key, count, elapsed = job.result()
+            print(
+                green
+                + f"{key}: {count:,} document(s) ({count / max(elapsed, 1e-9):,.0f} docs/s)"
+                + reset
+            )
+    print(yellow + f"Done in {time.perf_counter() - started:.1f}s" + reset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+# Card art for the terminal game.
+from utils.helpers import red, reset
+
+RANK_LABELS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+SUITS = ["♠", "♥", "♦", "♣"]
+
+
+def card_label(code):
+    rank, suit = int(code) % 13, int(code) // 13
+    label = f"{RANK_LABELS[rank]}{SUITS[suit]}"
+    # Hearts and diamonds in red.
+    return red + label + reset if suit in (1, 2) else label
+
+
+def render_hand(cards, hide_hole=False):
+    labels = [f"[{card_label(code)}]" for code in cards]
+    if hide_hole and len(labels) > 1:
+        labels[1] = "[??]"
+    return " ".join(labels)
@@ -1,8 +1,312 @@
 # Main game
-from utils.helpers import sleep, typing_effect
+import numpy as np
+from game.art import render_hand
+from game.rules import DEFAULT_RULES
+from game.shoe import CARD_VALUES, Shoe, ShoeRack
+from game.strategy import (
+    AFTER_FIRST_CARD,
+    DOUBLE,
+    DOUBLE_OR_STAND,
+    HIT,
+    SPLIT,
+    STAND,
+    SURRENDER,
+    SURRENDER_OR_STAND,
+    basic_strategy,
+    hint,
+)
+from utils.helpers import (
+    green,
+    red,
+    blue,
+    yellow,
+    reset,
+    clear,
+    sleep,
+    typing_effect,
+    input_quit_handle,
+)
 
+STARTING_CHIPS = 100
 
-def blackjack(user):
-    typing_effect("Under construction")
+
+def hand_totals(hard, aces):
+    # Works on ints and on arrays: count one ace as 11 when it fits.
+    soft = aces & (hard <= 11)
+    return hard + 10 * soft, soft
+
+
+class BatchEngine:
+    """Plays one round at every table per call, all tables in one vectorized pass."""
+
+    def __init__(
+        self,
+        tables=32768,
+        rules=DEFAULT_RULES,
+        strategy=None,
+        penetration=0.75,
+        cut_card=None,
+        seed=None,
+        shoes=None,
+    ):
+        self.rules = rules
+        # Any callable(total, soft, pair, upcard, first) -> action array.
+        self.strategy = strategy or basic_strategy(rules)
+        self.rng = np.random.default_rng(seed)
+        if shoes is None:
+            shoes = ShoeRack(tables, rules.decks, penetration, cut_card, self.rng)
+        self.shoes = shoes
+        self.tables = shoes.tables
+        self._draw = self.shoes.draw
+
+    def _play_hand(self, hard, aces, upcard, playing, first):
+        doubled = np.zeros(self.tables, dtype=bool)
+        no_pair = np.zeros(self.tables, dtype=np.int8)
+        while True:
+            total, soft = hand_totals(hard, aces)
+            playing &= total < 21
+            if not playing.any():
+                break
+            action = self.strategy(total, soft, no_pair, upcard, first)
+            action = np.where(first, action, AFTER_FIRST_CARD[action])
+            double = playing & ((action == DOUBLE) | (action == DOUBLE_OR_STAND))
+            playing &= double | (action == HIT) | (action == SURRENDER)
+            if not playing.any():
+                break
+            card = self._draw(playing)
+            hard += card
+            aces |= card == 1
+            doubled |= double
+            playing &= ~double
+            first = np.zeros(self.tables, dtype=bool)
+        return hard, aces, doubled
+
+    def _play_dealer(self, hard, aces, drawing):
+        while True:
+            total, soft = hand_totals(hard, aces)
+            drawing &= (total < 17) | (self.rules.hit_soft_17 & soft & (total == 17))
+            if not drawing.any():
+                return total
+            card = self._draw(drawing)
+            hard += card
+            aces |= card == 1
+
+    def play_round(self, bets=None, mask=None):
+        # mask limits the round to some tables (all if None); the others
+        # draw nothing and net 0.
+        rules = self.rules
+        self.shoes.reshuffle_due()
+
+        first_card = self._draw(mask)
+        upcard = self._draw(mask)
+        second_card = self._draw(mask)
+        hole_card = self._draw(mask)
+
+        player_hard = first_card + second_card
+        player_aces = (first_card == 1) | (second_card == 1)
+        dealer_hard = upcard + hole_card
+        dealer_aces = (upcard == 1) | (hole_card == 1)
+
+        player_bj = player_aces & (player_hard == 11)
+        dealer_bj = dealer_aces & (dealer_hard == 11)
+        net = np.zeros(self.tables)
+        net[player_bj & ~dealer_bj] = rules.blackjack_pays
+        net[dealer_bj & ~player_bj] = -1.0
+        live = ~(player_bj | dealer_bj)
+        if mask is not None:
+            live &= mask
+
+        # Surrender and split are only decided on the first two cards.
+        total, soft = hand_totals(player_hard, player_aces)
+        pair = np.where(first_card == second_card, first_card, 0).astype(np.int8)
+        action = self.strategy(total, soft, pair, upcard, live)
+        if rules.surrender:
+            surrender = live & ((action == SURRENDER) | (action == SURRENDER_OR_STAND))
+            net[surrender] = -0.5
+            live &= ~surrender
+        split = live & (pair > 0) & (action == SPLIT)
+        split_aces = split & (first_card == 1)
+
+        # First hand: the dealt two cards, or the first split card plus a new one.
+        hard_a = np.where(split, first_card, player_hard).astype(np.int8)
+        aces_a = np.where(split, first_card == 1, player_aces)
+        card = self._draw(split)
+        hard_a += card
+        aces_a |= card == 1
+        first_a = live & (~split | rules.double_after_split)
+        hard_a, aces_a, doubled_a = self._play_hand(
+            hard_a, aces_a, upcard, live & ~split_aces, first_a
+        )
+
+        # Second hand only exists after a split.
+        hard_b = np.where(split, second_card, 0).astype(np.int8)
+        aces_b = split & (second_card == 1)
+        card = self._draw(split)
+        hard_b += card
+        aces_b |= card == 1
+        first_b = split & rules.double_after_split
+        hard_b, aces_b, doubled_b = self._play_hand(
+            hard_b, aces_b, upcard, split & ~split_aces, first_b
+        )
+
+        total_a, _ = hand_totals(hard_a, aces_a)
+        total_b, _ = hand_totals(hard_b, aces_b)
+        needs_dealer = live & ((total_a <= 21) | (split & (total_b <= 21)))
+        dealer_total = self._play_dealer(dealer_hard, dealer_aces, needs_dealer)
+
+        net += np.where(live, _settle(total_a, doubled_a, dealer_total), 0.0)
+        net += np.where(split, _settle(total_b, doubled_b, dealer_total), 0.0)
+        return net if bets is None else net * bets
+
+    def play(self, n_rounds):
+        results = []
+        played = 0
+        while played < n_rounds:
+            # The last round only deals at as many tables as are still needed.
+            needed = n_rounds - played
+            mask = None if needed >= self.tables else np.arange(self.tables) < needed
+            results.append(self.play_round(mask=mask))
+            played += self.tables
+        return np.concatenate(results)[:n_rounds]
+
+
+def _settle(total, doubled, dealer_total):
+    stake = np.where(doubled, 2.0, 1.0)
+    won = (total <= 21) & ((dealer_total > 21) | (total > dealer_total))
+    lost = (total > 21) | ((dealer_total <= 21) & (total < dealer_total))
+    return stake * won - stake * lost
+
+
+def play_rounds(
+    n_rounds, rules=DEFAULT_RULES, seed=None, tables=32768, penetration=0.75
+):
+    # Headless batch API: net result per round in units of the bet.
+    engine = BatchEngine(
+        tables=min(tables, n_rounds), rules=rules, penetration=penetration, seed=seed
+    )
+    return engine.play(n_rounds)
+
+
+# Interactive single-hand mode.
+
+
+def hand_total(cards):
+    # Best total of a list of card codes.
+    values = CARD_VALUES[cards]
+    total, _ = hand_totals(int(values.sum()), bool((values == 1).any()))
+    return total
+
+
+def dealer_must_hit(cards, rules=DEFAULT_RULES):
+    values = CARD_VALUES[cards]
+    total, soft = hand_totals(int(values.sum()), bool((values == 1).any()))
+    return total < 17 or (total == 17 and soft and rules.hit_soft_17)
+
+
+def _show_table(player, dealer, hide_hole=True):
+    clear()
+    dealer_total = "?" if hide_hole else hand_total(dealer)
+    print(blue + f"Dealer ({dealer_total}): " + reset + render_hand(dealer, hide_hole))
+    print(green + f"You    ({hand_total(player)}): " + reset + render_hand(player))
+    print()
+
+
+def _ask_bet(chips):
+    while True:
+        bet = input_quit_handle(
+            green + f"Chips: {chips}. Enter your bet (or 'n' to leave): "
+        ).strip()
+        if bet in {"n", "no"}:
+            return 0
+        if bet.isdigit() and 1 <= int(bet) <= chips:
+            return int(bet)
+        print(red + f"Enter a bet between 1 and {chips}." + reset)
+
+
+def _play_single_hand(shoe, bet, chips, rules):
+    player = [shoe.draw()]
+    dealer = [shoe.draw()]
+    player.append(shoe.draw())
+    dealer.append(shoe.draw())
+    _show_table(player, dealer)
+
+    player_bj = hand_total(player) == 21
+    dealer_bj = hand_total(dealer) == 21
+    if player_bj or dealer_bj:
+        _show_table(player, dealer, hide_hole=False)
+        if player_bj and dealer_bj:
+            typing_effect(blue + "Both have blackjack. Push." + reset)
+            return 0
+        if player_bj:
+            typing_effect(green + "Blackjack!" + reset)
+            return int(bet * rules.blackjack_pays)
+        typing_effect(red + "Dealer has blackjack." + reset)
+        return -bet
+
+    while hand_total(player) < 21:
+        can_double = len(player) == 2 and bet * 2 <= chips
+        options = "(h)it, (s)tand" + (", (d)ouble" if can_double else "")
+        action = input_quit_handle(green + f"{options}, (?) hint: ").strip()
+        if action in {"?", "hint"}:
+            values = [int(v) for v in CARD_VALUES[player]]
+            # Only what this table offers: no split or surrender here.
+            legal = {STAND, HIT, DOUBLE} if can_double else {STAND, HIT}
+            advice = hint(values, int(CARD_VALUES[dealer[0]]), rules, legal)
+            print(yellow + f"Basic strategy says: {advice}" + reset)
+            continue
+        if action in {"h", "hit"}:
+            player.append(shoe.draw())
+        elif action in {"d", "double"} and can_double:
+            bet *= 2
+            player.append(shoe.draw())
+            _show_table(player, dealer)
+            break
+        elif action in {"s", "stand"}:
+            break
+        else:
+            print(red + "Invalid choice, please select again." + reset)
+            continue
+        _show_table(player, dealer)
+
+    player_total = hand_total(player)
+    if player_total > 21:
+        typing_effect(red + f"Bust with {player_total}!" + reset)
+        return -bet
+
+    while dealer_must_hit(dealer, rules):
+        dealer.append(shoe.draw())
+    _show_table(player, dealer, hide_hole=False)
+
+    dealer_total = hand_total(dealer)
+    if dealer_total > 21 or player_total > dealer_total:
+        typing_effect(green + f"You win {bet}!" + reset)
+        return bet
+    if player_total < dealer_total:
+        typing_effect(red + f"Dealer wins with {dealer_total}." + reset)
+        return -bet
+    typing_effect(blue + "Push." + reset)
+    return 0
+
+
+def blackjack(user, rules=DEFAULT_RULES):
+    shoe = Shoe(rules.decks)
+    chips = STARTING_CHIPS
+
+    typing_effect(green + f"Welcome to the table, {user['name']}!" + reset)
+    sleep()
+    while chips > 0:
+        bet = _ask_bet(chips)
+        if not bet:
+            break
+        # The cut card came out last hand: shuffle before the next one.
+        if shoe.needs_shuffle:
+            typing_effect(yellow + "Shuffling the shoe..." + reset)
+            shoe.shuffle()
+        chips += _play_single_hand(shoe, bet, chips, rules)
+        sleep()
+
+    if chips <= 0:
+        typing_effect(red + "You are out of chips." + reset)
+    typing_effect(blue + f"You leave the table with {chips} chips." + reset)
     sleep()
-    return
+    return chips
@@ -0,0 +1,123 @@
+# Card counting systems and a batched count/penetration sweep.
+from typing import NamedTuple
+import numpy as np
+from game.blackjack import BatchEngine
+from game.rules import DEFAULT_RULES
+from game.shoe import ShoeRack, cut_position
+
+# Betting index range the bet ramp covers; counts outside are clamped.
+MIN_INDEX, MAX_INDEX = -20, 20
+
+
+class CountSystem(NamedTuple):
+    # Tags by card value: ace, 2..9, ten-valued cards.
+    tags: tuple
+
+    @property
+    def balanced(self):
+        return sum(self.tags[:9]) + 4 * self.tags[9] == 0
+
+
+COUNT_SYSTEMS = {
+    "hi-lo": CountSystem((-1, 1, 1, 1, 1, 1, 0, 0, 0, -1)),
+    "ko": CountSystem((-1, 1, 1, 1, 1, 1, 1, 0, 0, -1)),
+    "omega-ii": CountSystem((0, 1, 1, 2, 2, 2, 1, 0, -1, -2)),
+}
+
+
+def parse_tags(text):
+    tags = tuple(int(tag) for tag in text.split(","))
+    if len(tags) != 10:
+        raise ValueError("A tag vector needs 10 values: A,2,3,4,5,6,7,8,9,T")
+    return CountSystem(tags)
+
+
+def bet_ramp(spread, start=1):
+    # Units by betting index MIN_INDEX..MAX_INDEX: 1 unit up to start,
+    # then one more unit per point, capped at spread.
+    index = np.arange(MIN_INDEX, MAX_INDEX + 1)
+    return np.clip(index - start + 1, 1, spread).astype(np.float64)
+
+
+class CountTracker:
+    """Running counts for several systems at every table, updated per card.
+
+    Balanced systems bet off the true count (running count per deck left).
+    Unbalanced ones start at the usual IRC of 4 - 4 * decks and bet off the
+    running count, which tracks the true count around the pivot.
+    """
+
+    def __init__(self, systems, shoes):
+        self.shoes = shoes
+        # Column 0 is the "no card" value draw() returns for masked tables.
+        self.tags = np.zeros((len(systems), 11), dtype=np.int32)
+        self.tags[:, 1:] = [system.tags for system in systems]
+        self.balanced = np.array([system.balanced for system in systems])
+        decks = shoes.shoe_size // 52
+        self.initial = np.where(self.balanced, 0, 4 - 4 * decks)[:, None]
+        self.running = np.repeat(self.initial, shoes.tables, axis=1)
+
+    def observe(self, cards):
+        self.running += self.tags[:, cards]
+
+    def reset(self, rows):
+        self.running[:, rows] = self.initial
+
+    def betting_index(self):
+        decks_left = np.maximum((self.shoes.shoe_size - self.shoes.cursor) / 52, 0.25)
+        true_count = np.floor(self.running / decks_left)
+        index = np.where(self.balanced[:, None], true_count, self.running)
+        return np.clip(index, MIN_INDEX, MAX_INDEX).astype(np.intp)
+
+    def bets(self, ramp):
+        return ramp[self.betting_index() - MIN_INDEX]
+
+
+def sweep(
+    systems,
+    penetrations,
+    shoes=4096,
+    rules=DEFAULT_RULES,
+    spread=8,
+    seed=None,
+):
+    """Play every pre-generated shoe once per penetration, all systems at once.
+
+    Play does not depend on the bet, so each round is played once and
+    every system's ramp is applied to the same per-round results.
+    Returns sums by (system, penetration): rounds, wagered, won, won_sq.
+    """
+    rng = np.random.default_rng(seed)
+    generated = ShoeRack(shoes, rules.decks, rng=rng).cards
+    cuts = [cut_position(generated.shape[1], p) for p in penetrations]
+    rack = ShoeRack.from_cards(
+        np.tile(generated, (len(penetrations), 1)), np.repeat(cuts, shoes), rng
+    )
+    tracker = CountTracker(systems, rack)
+    rack.observers.append(tracker)
+    engine = BatchEngine(rules=rules, shoes=rack, seed=rng)
+    ramp = bet_ramp(spread)
+
+    shape = (len(systems), len(penetrations))
+    rounds = np.zeros(len(penetrations))
+    wagered, won, won_sq = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    while True:
+        active = rack.active
+        if not active.any():
+            break
+        bets = tracker.bets(ramp) * active
+        # Shoes past their cut card sit the round out.
+        result = bets * engine.play_round(mask=active)
+
+        # Rows are laid out as one block of shoes per penetration.
+        rounds += active.reshape(len(penetrations), shoes).sum(axis=1)
+        wagered += bets.reshape(*shape, shoes).sum(axis=2)
+        won += result.reshape(*shape, shoes).sum(axis=2)
+        won_sq += (result**2).reshape(*shape, shoes).sum(axis=2)
+
+    return {
+        "rounds": np.broadcast_to(rounds, shape).copy(),
+        "wagered": wagered,
+        "won": won,
+        "won_sq": won_sq,
+    }
@@ -0,0 +1,135 @@
+# Exact dealer final-total probabilities, precomputed into an on-disk table.
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from game.rules import DEFAULT_RULES
+
+# Final dealer outcomes, in table column order.
+OUTCOMES = ("17", "18", "19", "20", "21", "bust")
+BUST = len(OUTCOMES) - 1
+
+# Deck counts and rule flags stored in the precomputed table.
+DECK_COUNTS = (1, 2, 4, 6, 8)
+TABLE_PATH = Path(__file__).resolve().parent.parent / "data" / "dealer_table.npz"
+
+_table = None
+
+# Memo entries kept for _dealer_from; one full two-card table build needs
+# about 200k, and builds clear it when done (see clear_cache).
+DEALER_CACHE_SIZE = 2**18
+
+
+def full_shoe(decks):
+    # Card counts by value 1..10 (index 0 is aces, index 9 all ten-valued cards).
+    return (4 * decks,) * 9 + (16 * decks,)
+
+
+@lru_cache(maxsize=DEALER_CACHE_SIZE)
+def _dealer_from(counts, hard, aces, hit_soft_17):
+    soft = aces and hard <= 11
+    total = hard + 10 if soft else hard
+    if total > 21:
+        return (0.0,) * BUST + (1.0,)
+    if total > 17 or (total == 17 and not (soft and hit_soft_17)):
+        result = [0.0] * len(OUTCOMES)
+        result[total - 17] = 1.0
+        return tuple(result)
+
+    remaining = sum(counts)
+    result = [0.0] * len(OUTCOMES)
+    for index, count in enumerate(counts):
+        if not count:
+            continue
+        value = index + 1
+        rest = counts[:index] + (count - 1,) + counts[index + 1 :]
+        branch = _dealer_from(rest, hard + value, aces or value == 1, hit_soft_17)
+        weight = count / remaining
+        for outcome, p in enumerate(branch):
+            result[outcome] += weight * p
+    return tuple(result)
+
+
+def clear_cache():
+    # Compositions rarely repeat across tables, so drop them after a build.
+    _dealer_from.cache_clear()
+
+
+def dealer_distribution(upcard, counts, hit_soft_17=False, peek=False):
+    """Probabilities of OUTCOMES for an upcard (1..10) and the unseen cards.
+
+    counts is the composition still in the shoe by value, upcard already
+    removed. With peek, the dealer is known not to hold a blackjack.
+    """
+    counts = tuple(int(c) for c in counts)
+    result = np.zeros(len(OUTCOMES))
+    # Hole card excluded by the peek (ten under an ace, ace under a ten).
+    excluded = {1: 10, 10: 1}.get(upcard) if peek else None
+
+    remaining = sum(c for value, c in enumerate(counts, 1) if value != excluded)
+    for index, count in enumerate(counts):
+        value = index + 1
+        if not count or value == excluded:
+            continue
+        rest = counts[:index] + (count - 1,) + counts[index + 1 :]
+        hard = upcard + value
+        branch = _dealer_from(rest, hard, upcard == 1 or value == 1, hit_soft_17)
+        result += count / remaining * np.array(branch)
+    return result
+
+
+def shoe_distribution(upcard, decks, hit_soft_17=False, peek=False):
+    counts = list(full_shoe(decks))
+    counts[upcard - 1] -= 1
+    return dealer_distribution(upcard, counts, hit_soft_17, peek)
+
+
+def build_table():
+    # Shape: (deck count, hit_soft_17, peek, upcard 1..10, outcome).
+    table = np.zeros((len(DECK_COUNTS), 2, 2, 10, len(OUTCOMES)))
+    for d, decks in enumerate(DECK_COUNTS):
+        for h17 in (0, 1):
+            for peek in (0, 1):
+                for upcard in range(1, 11):
+                    table[d, h17, peek, upcard - 1] = shoe_distribution(
+                        upcard, decks, bool(h17), bool(peek)
+                    )
+        clear_cache()
+    return table
+
+
+def save_table(table, path=TABLE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, table=table.astype(np.float32), decks=DECK_COUNTS)
+
+
+def load_table(path=TABLE_PATH):
+    global _table
+    if _table is None:
+        if path.exists():
+            with np.load(path) as data:
+                _table = data["table"].astype(np.float64)
+        else:
+            _table = build_table()
+            save_table(_table, path)
+    return _table
+
+
+def dealer_table(rules=DEFAULT_RULES, peek=True):
+    # (10, len(OUTCOMES)) array for a full shoe under rules; row 0 is an ace up.
+    if rules.decks in DECK_COUNTS:
+        table = load_table()
+        return table[DECK_COUNTS.index(rules.decks), int(rules.hit_soft_17), int(peek)]
+    return np.array(
+        [
+            shoe_distribution(upcard, rules.decks, rules.hit_soft_17, peek)
+            for upcard in range(1, 11)
+        ]
+    )
+
+
+if __name__ == "__main__":
+    from utils.helpers import green, reset
+
+    table = build_table()
+    save_table(table)
+    print(green + f"Dealer table saved to {TABLE_PATH}" + reset)
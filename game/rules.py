@@ -0,0 +1,25 @@
+# Table rules shared by the engine, strategy tables and the simulator.
+from typing import NamedTuple
+
+
+class Rules(NamedTuple):
+    decks: int = 6
+    hit_soft_17: bool = False
+    blackjack_pays: float = 1.5
+    double_after_split: bool = True
+    surrender: bool = False
+
+
+DEFAULT_RULES = Rules()
+
+# Named rule sets the tables and the simulator know about.
+RULE_VARIANTS = {
+    "s17": DEFAULT_RULES,
+    "h17": Rules(hit_soft_17=True),
+    "s17-ls": Rules(surrender=True),
+    "h17-ls": Rules(hit_soft_17=True, surrender=True),
+    "s17-nodas": Rules(double_after_split=False),
+    "double-deck": Rules(decks=2),
+    "single-deck": Rules(decks=1, hit_soft_17=True, double_after_split=False),
+    "six-five": Rules(blackjack_pays=1.2),
+}
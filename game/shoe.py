@@ -0,0 +1,132 @@
+# Multi-deck shoes backed by preallocated int8 buffers.
+import numpy as np
+
+# Cards are int8 codes 0..51: rank = code % 13, suit = code // 13.
+# Engine arithmetic runs on blackjack values (ace = 1, faces = 10).
+CARD_VALUES = np.array([min(rank + 1, 10) for rank in range(13)] * 4, dtype=np.int8)
+
+
+def cut_position(shoe_size, penetration=0.75, cut_card=None):
+    # cut_card (cards from the front) wins over penetration when both are given.
+    cut = cut_card if cut_card is not None else int(shoe_size * penetration)
+    if not 0 < cut <= shoe_size:
+        raise ValueError(
+            f"Cut card must be inside the shoe (1..{shoe_size}), got {cut}"
+        )
+    return cut
+
+
+class Shoe:
+    """One table's shoe: a draw only moves the cursor, a shuffle is in place."""
+
+    def __init__(self, decks=6, penetration=0.75, cut_card=None, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.cards = np.tile(np.arange(52, dtype=np.int8), decks)
+        self.cut = cut_position(len(self.cards), penetration, cut_card)
+        self.cursor = 0
+        self.shuffle()
+
+    def shuffle(self):
+        # Generator.shuffle is an in-place Fisher-Yates over the buffer.
+        self.rng.shuffle(self.cards)
+        self.cursor = 0
+
+    @property
+    def needs_shuffle(self):
+        return self.cursor >= self.cut
+
+    @property
+    def remaining(self):
+        return len(self.cards) - self.cursor
+
+    def draw(self):
+        if self.cursor >= len(self.cards):
+            self.shuffle()
+        code = self.cards[self.cursor]
+        self.cursor += 1
+        return int(code)
+
+
+class ShoeRack:
+    """A shoe per table for the batch engine, one row of the buffer each.
+
+    Suits do not matter to the engine, so the rack holds card values
+    directly instead of codes.
+    """
+
+    def __init__(self, tables, decks=6, penetration=0.75, cut_card=None, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.tables = tables
+        self.shoe_size = 52 * decks
+        self.cut = cut_position(self.shoe_size, penetration, cut_card)
+        self.cards = np.tile(CARD_VALUES, (tables, decks))
+        self.cursor = np.zeros(tables, dtype=np.int64)
+        self.reshuffle = True
+        # Objects with observe(cards) and reset(rows), e.g. count trackers.
+        self.observers = []
+        self._rows = np.arange(tables)
+        self.rng.permuted(self.cards, axis=1, out=self.cards)
+
+        self.spent = np.zeros(tables, dtype=bool)
+
+    @classmethod
+    def from_cards(cls, cards, cut, rng=None):
+        # Replays pre-generated shoes once each; cut may differ per row.
+        # rng only reshuffles a row that runs out of cards mid-round.
+        rack = cls.__new__(cls)
+        rack.rng = rng if rng is not None else np.random.default_rng()
+        rack.tables, rack.shoe_size = cards.shape
+        rack.cut = cut
+        rack.cards = cards
+        rack.cursor = np.zeros(rack.tables, dtype=np.int64)
+        rack.reshuffle = False
+        rack.observers = []
+        rack._rows = np.arange(rack.tables)
+        rack.spent = np.zeros(rack.tables, dtype=bool)
+        return rack
+
+    @property
+    def active(self):
+        # Tables whose cut card has not come out yet.
+        return (self.cursor < self.cut) & ~self.spent
+
+    def _shuffle_rows(self, rows):
+        # Row by row so the shuffle stays in place in the rack's buffer.
+        for row in rows:
+            self.rng.shuffle(self.cards[row])
+        self.cursor[rows] = 0
+        for observer in self.observers:
+            observer.reset(rows)
+
+    def reshuffle_due(self):
+        done = ~self.active
+        if self.reshuffle and done.any():
+            self._shuffle_rows(np.flatnonzero(done))
+        return done
+
+    def _refill(self, rows):
+        # A round that runs past the end of a shoe goes on with that shoe
+        # reshuffled rather than re-dealing its cards in the same order.
+        # A replayed shoe counts as played through from then on.
+        empty = rows[self.cursor[rows] >= self.shoe_size]
+        if len(empty):
+            self._shuffle_rows(empty)
+            if not self.reshuffle:
+                self.spent[empty] = True
+
+    def draw(self, mask=None):
+        # One card per table in mask (all tables if None); 0 for the others.
+        if mask is None:
+            self._refill(self._rows)
+            card = self.cards[self._rows, self.cursor]
+            self.cursor += 1
+        else:
+            card = np.zeros(self.tables, dtype=np.int8)
+            rows = np.flatnonzero(mask)
+            self._refill(rows)
+            position = self.cursor[rows]
+            card[rows] = self.cards[rows, position]
+            self.cursor[rows] = position + 1
+        for observer in self.observers:
+            observer.observe(card)
+        return card
@@ -0,0 +1,331 @@
+# Monte Carlo house-edge simulator: python -m game.simulate --help
+import argparse
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing
+from itertools import islice
+from statistics import NormalDist
+import numpy as np
+from game.blackjack import BatchEngine
+from game.counting import COUNT_SYSTEMS, parse_tags, sweep
+from game.rules import RULE_VARIANTS
+from utils.helpers import green, blue, yellow, reset
+
+
+class RunningStats:
+    """Count, mean and sum of squared deviations; mergeable across workers."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_array(cls, values):
+        mean = float(values.mean())
+        return cls(len(values), mean, float(((values - mean) ** 2).sum()))
+
+    def merge(self, other):
+        # Chan et al. pairwise update, exact for any split of the samples.
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stderr(self):
+        return math.sqrt(self.variance / self.count) if self.count else math.inf
+
+    def half_width(self, confidence=0.95):
+        return NormalDist().inv_cdf(0.5 + confidence / 2) * self.stderr
+
+
+def simulate_chunk(rules, hands, seed, tables, penetration):
+    # Runs in a worker process; seed is that chunk's own SeedSequence.
+    engine = BatchEngine(
+        tables=min(tables, hands),
+        rules=rules,
+        penetration=penetration,
+        seed=seed,
+    )
+    stats = RunningStats.from_array(engine.play(hands))
+    return stats.count, stats.mean, stats.m2
+
+
+def _in_order(fn, jobs, workers):
+    # Yields fn(*job) in job order with at most 2 * workers jobs in flight,
+    # so results (and early stops) do not depend on worker timing.
+    workers = workers or os.cpu_count()
+    jobs = enumerate(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending, finished, next_index = {}, {}, 0
+        try:
+            while True:
+                for index, job in islice(jobs, 2 * workers - len(pending)):
+                    pending[pool.submit(fn, *job)] = index
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[pending.pop(future)] = future.result()
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def run(
+    rules,
+    hands,
+    workers=None,
+    chunk=2_000_000,
+    seed=None,
+    target_ci=None,
+    confidence=0.95,
+    tables=32768,
+    penetration=0.75,
+    progress=print,
+):
+    """Shard hands over a process pool and return the merged RunningStats.
+
+    Every chunk gets its own SeedSequence child and chunks are merged in
+    order, so a seed gives the same result for any worker count.
+    """
+    root = np.random.SeedSequence(seed)
+    jobs = (
+        (rules, min(chunk, hands - start), root.spawn(1)[0], tables, penetration)
+        for start in range(0, hands, chunk)
+    )
+    stats = RunningStats()
+    started = time.perf_counter()
+    with closing(_in_order(simulate_chunk, jobs, workers)) as results:
+        for result in results:
+            stats.merge(RunningStats(*result))
+            half_width = stats.half_width(confidence)
+            if progress:
+                rate = stats.count / (time.perf_counter() - started)
+                progress(
+                    blue
+                    + f"{stats.count:>14,} hands  edge {stats.mean:+.5f}"
+                    + f" ± {half_width:.5f}  ({rate:,.0f} hands/s)"
+                    + reset
+                )
+            if target_ci and half_width <= target_ci:
+                break
+    return stats
+
+
+def sweep_stats(totals):
+    # RunningStats per (system, penetration) for the result per round.
+    grid = []
+    for s in range(totals["rounds"].shape[0]):
+        row = []
+        for p in range(totals["rounds"].shape[1]):
+            count, total = totals["rounds"][s, p], totals["won"][s, p]
+            m2 = totals["won_sq"][s, p] - total**2 / count if count else 0.0
+            row.append(RunningStats(int(count), total / count if count else 0.0, m2))
+        grid.append(row)
+    return grid
+
+
+def run_sweep(
+    rules,
+    systems,
+    penetrations,
+    shoes,
+    workers=None,
+    chunk=4096,
+    seed=None,
+    spread=8,
+    target_ci=None,
+    confidence=0.95,
+    progress=print,
+):
+    """Count/penetration sweep sharded by shoes; returns summed totals."""
+    root = np.random.SeedSequence(seed)
+    jobs = (
+        (
+            systems,
+            penetrations,
+            min(chunk, shoes - start),
+            rules,
+            spread,
+            root.spawn(1)[0],
+        )
+        for start in range(0, shoes, chunk)
+    )
+    totals = None
+    played = 0
+    with closing(_in_order(sweep, jobs, workers)) as results:
+        for result in results:
+            if totals is None:
+                totals = result
+            else:
+                for key in totals:
+                    totals[key] += result[key]
+            played += min(chunk, shoes - played)
+            widest = max(
+                stats.half_width(confidence)
+                for row in sweep_stats(totals)
+                for stats in row
+            )
+            if progress:
+                progress(
+                    blue + f"{played:>12,} shoes  widest CI ± {widest:.5f}" + reset
+                )
+            if target_ci and widest <= target_ci:
+                break
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m game.simulate",
+        description="Estimate the player's edge under basic strategy, flat or counting.",
+    )
+    parser.add_argument(
+        "--hands",
+        type=float,
+        default=None,
+        help="hands per variant (default: 1e8; 1e9 is fine)",
+    )
+    parser.add_argument(
+        "--variant",
+        action="append",
+        choices=[*RULE_VARIANTS, "all"],
+        help="rule variant to run, repeatable (default: s17)",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--chunk",
+        type=int,
+        default=None,
+        help="hands per worker job (default: 2,000,000); shoes with --count"
+        " (default: 4096)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--target-ci",
+        type=float,
+        default=None,
+        help="stop once the CI half-width drops below this (units of bet)",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--tables", type=int, default=None, help="tables per batch (default: 32768)"
+    )
+    parser.add_argument(
+        "--penetration",
+        type=float,
+        action="append",
+        help="shoe penetration, repeatable (default: 0.75)",
+    )
+    counting = parser.add_argument_group(
+        "count sweep", "evaluate counting systems and bet spreads instead"
+    )
+    counting.add_argument(
+        "--count", action="append", choices=list(COUNT_SYSTEMS), help="repeatable"
+    )
+    counting.add_argument(
+        "--tags",
+        action="append",
+        type=parse_tags,
+        help="custom tag vector A,2,3,4,5,6,7,8,9,T (repeatable)",
+    )
+    counting.add_argument("--spread", type=int, default=8, help="max bet in units")
+    counting.add_argument("--shoes", type=float, default=1e6, help="shoes per variant")
+    args = parser.parse_args(argv)
+
+    variants = args.variant or ["s17"]
+    if "all" in variants:
+        variants = list(RULE_VARIANTS)
+    penetrations = args.penetration or [0.75]
+
+    if args.count or args.tags:
+        # The sweep plays whole shoes, one table per shoe.
+        if args.hands is not None or args.tables is not None:
+            parser.error(
+                "--hands and --tables do not apply to a count sweep; use --shoes"
+            )
+        systems = {name: COUNT_SYSTEMS[name] for name in args.count or []}
+        for tags in args.tags or []:
+            systems[",".join(map(str, tags.tags))] = tags
+        for name in variants:
+            print(green + f"Count sweep {name}: {RULE_VARIANTS[name]}" + reset)
+            totals = run_sweep(
+                RULE_VARIANTS[name],
+                list(systems.values()),
+                penetrations,
+                int(args.shoes),
+                workers=args.workers,
+                chunk=args.chunk or 4096,
+                seed=args.seed,
+                spread=args.spread,
+                target_ci=args.target_ci,
+                confidence=args.confidence,
+            )
+            _print_sweep(name, systems, penetrations, totals, args.confidence)
+        return
+
+    results = {}
+    for name in variants:
+        for penetration in penetrations:
+            print(green + f"Simulating {name}: {RULE_VARIANTS[name]}" + reset)
+            results[name, penetration] = run(
+                RULE_VARIANTS[name],
+                int(args.hands or 1e8),
+                workers=args.workers,
+                chunk=args.chunk or 2_000_000,
+                seed=args.seed,
+                target_ci=args.target_ci,
+                confidence=args.confidence,
+                tables=args.tables or 32768,
+                penetration=penetration,
+            )
+
+    print(
+        yellow
+        + f"\n{'variant':<14}{'pen':>6}{'hands':>16}{'edge':>11}{'± CI':>10}"
+        + reset
+    )
+    for (name, penetration), stats in results.items():
+        half_width = stats.half_width(args.confidence)
+        print(
+            f"{name:<14}{penetration:>6.2f}{stats.count:>16,}"
+            f"{stats.mean:>+11.5f}{half_width:>10.5f}"
+        )
+
+
+def _print_sweep(variant, systems, penetrations, totals, confidence):
+    print(
+        yellow
+        + f"\n{variant:<24}{'pen':>6}{'rounds':>14}{'avg bet':>9}"
+        + f"{'edge':>10}{'win/round':>11}{'± CI':>9}"
+        + reset
+    )
+    grid = sweep_stats(totals)
+    for s, name in enumerate(systems):
+        for p, penetration in enumerate(penetrations):
+            stats = grid[s][p]
+            avg_bet = totals["wagered"][s, p] / max(stats.count, 1)
+            edge = totals["won"][s, p] / max(totals["wagered"][s, p], 1)
+            print(
+                f"{name:<24}{penetration:>6.2f}{stats.count:>14,}{avg_bet:>9.2f}"
+                f"{edge:>+10.5f}{stats.mean:>+11.5f}{stats.half_width(confidence):>9.5f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# Basic and composition-dependent strategy as flat lookup tables.
+from functools import lru_cache
+import numpy as np
+from game.dealer import (
+    BUST,
+    clear_cache,
+    dealer_distribution,
+    dealer_table,
+    full_shoe,
+)
+from game.rules import DEFAULT_RULES
+
+# Player actions. The "or" variants are the fallback once the first
+# decision is over (no more doubling or surrendering).
+STAND, HIT, DOUBLE, DOUBLE_OR_STAND, SPLIT, SURRENDER, SURRENDER_OR_STAND = range(7)
+AFTER_FIRST_CARD = np.array([STAND, HIT, HIT, STAND, HIT, HIT, STAND], dtype=np.int8)
+ACTION_NAMES = [
+    "stand",
+    "hit",
+    "double",
+    "double (else stand)",
+    "split",
+    "surrender",
+    "surrender (else stand)",
+]
+
+# Basic table layout: index = ((pair * 2 + soft) * TOTALS + total) * 10 + upcard - 1,
+# pair 0 for "not a splittable pair", else the pair card value 1..10.
+TOTALS = 32
+BASIC_SIZE = 11 * 2 * TOTALS * 10
+# Two-card table layout: index = ((card1 - 1) * 10 + card2 - 1) * 10 + upcard - 1.
+TWO_CARD_SIZE = 10 * 10 * 10
+
+# Hard totals run to 41 (hard 31 plus a ten) so draws never index out of range.
+_HARD = 42
+
+
+def _total(hard, aces):
+    return hard + 10 if aces and hard <= 11 else hard
+
+
+def _solve(dealer, probs, rules):
+    # EVs per (hard, aces) state against one upcard, cards drawn with probs.
+    stand_by_total = np.full(_HARD + 10, -1.0)
+    for total in range(22):
+        win = dealer[BUST] + dealer[: max(0, min(total - 17, 5))].sum()
+        lose = dealer[max(0, total - 16) : BUST].sum()
+        stand_by_total[total] = win - lose
+
+    stand = np.full((_HARD, 2), -1.0)
+    hit = np.full((_HARD, 2), -1.0)
+    double = np.full((_HARD, 2), -2.0)
+    best = np.full((_HARD, 2), -1.0)
+    for hard in range(21, 1, -1):
+        for aces in (1, 0):
+            total = _total(hard, aces)
+            stand[hard, aces] = stand_by_total[total]
+            hit_ev = double_ev = 0.0
+            for value in range(1, 11):
+                new_hard = min(hard + value, _HARD - 1)
+                new_aces = int(aces or value == 1)
+                hit_ev += probs[value - 1] * best[new_hard, new_aces]
+                double_ev += (
+                    probs[value - 1] * stand_by_total[_total(new_hard, new_aces)]
+                )
+            hit[hard, aces] = hit_ev
+            double[hard, aces] = 2 * double_ev
+            best[hard, aces] = max(stand[hard, aces], hit_ev)
+    return stand, hit, double, best
+
+
+def _first_decision(hard, aces, evs, rules):
+    stand, hit, double, _ = evs
+    stand_ev, hit_ev, double_ev = stand[hard, aces], hit[hard, aces], double[hard, aces]
+    fallback_hits = hit_ev > stand_ev
+    best = max(stand_ev, hit_ev)
+    if rules.surrender and -0.5 > max(best, double_ev):
+        return (SURRENDER if fallback_hits else SURRENDER_OR_STAND), -0.5
+    if double_ev > best:
+        return (DOUBLE if fallback_hits else DOUBLE_OR_STAND), double_ev
+    return (HIT if fallback_hits else STAND), best
+
+
+def _split_ev(pair, evs, probs, rules):
+    stand, hit, double, _ = evs
+    hand_ev = 0.0
+    for value in range(1, 11):
+        hard, aces = pair + value, int(pair == 1 or value == 1)
+        if pair == 1:
+            # Split aces get one card each.
+            option = stand[hard, aces]
+        else:
+            option = max(stand[hard, aces], hit[hard, aces])
+            if rules.double_after_split:
+                option = max(option, double[hard, aces])
+        hand_ev += probs[value - 1] * option
+    return 2 * hand_ev
+
+
+def _pair_state(pair):
+    return 2 * pair, int(pair == 1)
+
+
+def _fill_upcard(table, upcard, evs, probs, rules):
+    for hard in range(2, 22):
+        for aces in (0, 1):
+            total = _total(hard, aces)
+            soft = int(total != hard)
+            if aces and not soft:
+                continue
+            action, _ = _first_decision(hard, aces, evs, rules)
+            for pair in range(11):
+                table[pair, soft, total, upcard - 1] = action
+
+    for pair in range(1, 11):
+        hard, aces = _pair_state(pair)
+        action, ev = _first_decision(hard, aces, evs, rules)
+        if _split_ev(pair, evs, probs, rules) > ev:
+            total = _total(hard, aces)
+            table[pair, int(total != hard), total, upcard - 1] = SPLIT
+
+
+@lru_cache(maxsize=None)
+def basic_strategy_table(rules=DEFAULT_RULES):
+    """Flat int8 decision table for rules, from the full-shoe dealer table."""
+    counts = np.array(full_shoe(rules.decks), dtype=np.float64)
+    probs = counts / counts.sum()
+    dealer = dealer_table(rules, peek=True)
+
+    table = np.full((11, 2, TOTALS, 10), STAND, dtype=np.int8)
+    for upcard in range(1, 11):
+        evs = _solve(dealer[upcard - 1], probs, rules)
+        _fill_upcard(table, upcard, evs, probs, rules)
+    return table.ravel()
+
+
+@lru_cache(maxsize=None)
+def two_card_table(rules=DEFAULT_RULES):
+    """Flat int8 first-decision table by exact two-card and upcard removal."""
+    table = np.full((10, 10, 10), STAND, dtype=np.int8)
+    for card1 in range(1, 11):
+        for card2 in range(card1, 11):
+            for upcard in range(1, 11):
+                counts = list(full_shoe(rules.decks))
+                for card in (card1, card2, upcard):
+                    counts[card - 1] -= 1
+                if min(counts) < 0:
+                    continue
+                probs = np.array(counts, dtype=np.float64) / sum(counts)
+                dealer = dealer_distribution(
+                    upcard, counts, rules.hit_soft_17, peek=True
+                )
+                evs = _solve(dealer, probs, rules)
+
+                hard, aces = card1 + card2, int(card1 == 1 or card2 == 1)
+                action, ev = _first_decision(hard, aces, evs, rules)
+                if card1 == card2 and _split_ev(card1, evs, probs, rules) > ev:
+                    action = SPLIT
+                table[card1 - 1, card2 - 1, upcard - 1] = action
+                table[card2 - 1, card1 - 1, upcard - 1] = action
+    clear_cache()
+    return table.ravel()
+
+
+def lookup(table, total, soft, pair, upcard):
+    # Works on scalars and arrays; totals past 21 land on STAND rows.
+    index = (np.asarray(pair, dtype=np.intp) * 2 + soft) * TOTALS
+    index = (index + np.minimum(total, TOTALS - 1)) * 10 + upcard - 1
+    return table[index]
+
+
+def table_strategy(table):
+    # Strategy callable for game.blackjack.BatchEngine.
+    def strategy(total, soft, pair, upcard, first):
+        return lookup(table, total, soft, pair, upcard)
+
+    return strategy
+
+
+def basic_strategy(rules=DEFAULT_RULES):
+    return table_strategy(basic_strategy_table(rules))
+
+
+def _fall_back(action, legal, total, soft, upcard, rules):
+    # The chart's own fallbacks for actions the table does not allow right
+    # now: a pair that cannot be split is played off its total, then
+    # D -> H, Ds -> S, R -> H, Rs -> S.
+    if action == SPLIT and SPLIT not in legal:
+        action = lookup(basic_strategy_table(rules), total, soft, 0, upcard)
+    if action in (DOUBLE, DOUBLE_OR_STAND) and DOUBLE not in legal:
+        action = AFTER_FIRST_CARD[action]
+    if action in (SURRENDER, SURRENDER_OR_STAND) and SURRENDER not in legal:
+        action = AFTER_FIRST_CARD[action]
+    return action
+
+
+def hint(cards, upcard, rules=DEFAULT_RULES, legal=None):
+    """Best action name for a hand of card values (1..10) against an upcard.
+
+    legal is the set of actions the table offers right now (all if None).
+    """
+    hard = sum(cards)
+    aces = 1 in cards
+    total = _total(hard, aces)
+    soft = int(total != hard)
+    if len(cards) == 2:
+        table = two_card_table(rules)
+        action = table[((cards[0] - 1) * 10 + cards[1] - 1) * 10 + upcard - 1]
+    else:
+        action = lookup(basic_strategy_table(rules), total, soft, 0, upcard)
+        action = AFTER_FIRST_CARD[action]
+    if legal is not None:
+        action = _fall_back(action, legal, total, soft, upcard, rules)
+    return ACTION_NAMES[action]
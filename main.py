@@ -1,5 +1,7 @@
 from register.register import main_register
-from user_login.login import login
+from user_login.login import load_admin_hashes, login
+from utils.geolocation import get_geolocator
+from utils.hashing import current_cost
 from utils.helpers import (
     green,
     red,
@@ -16,6 +18,10 @@ def main():
 
     typing_effect(blue + "Welcome to Blackjack!" + reset)
     typing_effect("type: 'q' or 'quit' to quit at any time!")
+    # Resolve this machine's location while the user types their login.
+    get_geolocator().prefetch()
+    load_admin_hashes()
+    current_cost()
     sleep()
 
     while True:
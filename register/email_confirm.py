@@ -1,9 +1,8 @@
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from itsdangerous import URLSafeTimedSerializer
-from utils.helpers import red, green, reset
+from config.constants import TOKEN_EXPIRATION
+from utils.helpers import green, reset
+from utils.mailer import send_mail
 
 serializer = URLSafeTimedSerializer(os.getenv("SECRET_KEY"))
 
@@ -12,7 +11,7 @@ def generate_confirmation_token(email):
     return serializer.dumps(email, salt="email-confirm-salt")
 
 
-def confirm_token(token, expiration=600):
+def confirm_token(token, expiration=TOKEN_EXPIRATION):
     try:
         email = serializer.loads(token, salt="email-confirm-salt", max_age=expiration)
     except Exception:
@@ -21,11 +20,6 @@ def confirm_token(token, expiration=600):
 
 
 def send_confirmation_mail(to_email, token):
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = os.getenv("SMTP_PORT")
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
-
     confirmation_url = f"http://127.0.0.1:5000/confirm/{token}"
 
     subject = "Confirm Your Registration"
@@ -39,16 +33,6 @@ def send_confirmation_mail(to_email, token):
         </body>
     </html>
     """
-    message = MIMEMultipart()
-    message["From"] = smtp_user
-    message["To"] = to_email
-    message["Subject"] = subject
-    message.attach(MIMEText(body, "html"))
-
-    try:
-        with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(smtp_user, to_email, message.as_string())
-            print(green + "Confirmation email sent successfully!" + reset)
-    except Exception as e:
-        print(red + f"Error sending email: {e}" + reset)
+    # Queued for the mail workers; registration does not wait on SMTP.
+    send_mail(to_email, subject, body)
+    print(green + "Confirmation email queued!" + reset)
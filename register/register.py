@@ -1,5 +1,6 @@
 # Main register
-from db.db_operations import insert_document
+from datetime import datetime, timezone
+from db.db_operations import update_documents
 from register.email_confirm import (
     generate_confirmation_token,
     send_confirmation_mail,
@@ -108,7 +109,6 @@ def main_register():
     hashed_sec_password = bcrypt_hash(sec_password)
 
     token = generate_confirmation_token(email)
-    send_confirmation_mail(email, token)
 
     system_info = get_system_info()
     mac_addresses = system_info.get("mac_addresses", [])
@@ -130,22 +130,31 @@ def main_register():
         "sec_password": hashed_sec_password,
         "role": "user",
         "token": token,
+        # The pending_users TTL index removes unconfirmed registrations.
+        "created_at": datetime.now(timezone.utc),
     }
 
     log_data = {
         "email": email,
         "location": location,
         "mac_address": mac_addresses,
+        "created_at": user_data["created_at"],
     }
 
-    try:
-        insert_document("pending_users", user_data)
-        insert_document("pending_log", log_data)
+    # Registering again before confirming replaces the pending records (new
+    # token and expiry) instead of tripping the unique email index.
+    saved = update_documents("pending_users", {"email": email}, user_data, upsert=True)
+    if not saved:
         typing_effect(
-            green
-            + "Registration almost done! Please check your email to confirm."
-            + reset
+            red + "Registration could not be saved. Please try again later." + reset
         )
         sleep()
-    except Exception as e:
-        typing_effect(red + f"An error occurred during registration: {e}" + reset)
+        return
+    update_documents("pending_log", {"email": email}, log_data, upsert=True)
+
+    # Only mail a link for a registration that is actually stored.
+    send_confirmation_mail(email, token)
+    typing_effect(
+        green + "Registration almost done! Please check your email to confirm." + reset
+    )
+    sleep()
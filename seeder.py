@@ -1,47 +1,110 @@
 # Testing db connection / collections and populate the DB with dummy data from json.
+# python seeder.py --help
 
-import json
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from utils.helpers import green, red, blue, reset
-from db.db_operations import insert_document
+from utils.helpers import green, red, blue, yellow, reset
+from db.db_operations import insert_documents
+from db.json_files import load_json
 from config.connect_db import MONGO_COLLECTIONS
+from db.indexes import ensure_indexes
 
 DATA_FOLDER = Path("./data")
+BATCH_SIZE = 1000
 
 
-def load_json(file_path: Path) -> list:
-    if not file_path.exists():
-        print(red + f"File {file_path} does not exists!" + reset)
-        return []
-    try:
-        with open(file_path, "r") as file:
-            data = json.load(file)
-            print(blue + f"Loaded data from {file_path.name}" + reset)
-            return data if isinstance(data, list) else [data]
-    except json.JSONDecodeError as e:
-        print(red + f"Error decoding JSON from {file_path} : {e}" + reset)
-        return []
+def data_file(collection_key: str, folder: Path = DATA_FOLDER):
+    # NDJSON wins over a JSON array when both exist.
+    for suffix in (".ndjson", ".jsonl", ".json"):
+        path = folder / f"{collection_key}{suffix}"
+        if path.exists():
+            return path
+    return None
 
 
-def seed_collection(collection_key: str, data: list):
-    if not data:
+def seed_collection(collection_key: str, data, batch_size: int = BATCH_SIZE):
+    # Unordered insert_many per batch; returns (inserted, seconds).
+    started = time.perf_counter()
+    data = iter(data)
+    inserted = 0
+    while batch := list(islice(data, batch_size)):
+        inserted += insert_documents(collection_key, batch, ordered=False)
+    elapsed = time.perf_counter() - started
+
+    if not inserted:
         print(blue + f"No data to seed for collection: {collection_key}" + reset)
-        return
-    for document in data:
-        insert_document(collection_key, document)
-    print(green + f"Seeded {len(data)} document(s) into {collection_key}" + reset)
+    else:
+        print(
+            green
+            + f"Seeded {inserted:,} document(s) into {collection_key}"
+            + f" ({inserted / elapsed:,.0f} docs/s)"
+            + reset
+        )
+    return inserted, elapsed
+
+
+def _seed_file(collection_key, folder, batch_size):
+    json_file = data_file(collection_key, folder)
+    if json_file is None:
+        print(blue + f"No data file for {collection_key}, skipping." + reset)
+        return 0
+    print(blue + f"Processing {collection_key} from {json_file.name},..." + reset)
+    return seed_collection(collection_key, load_json(json_file), batch_size)[0]
+
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python seeder.py", description="Seed the database from data files."
+    )
+    parser.add_argument("--data", type=Path, default=DATA_FOLDER)
+    parser.add_argument(
+        "--collection",
+        action="append",
+        choices=list(MONGO_COLLECTIONS),
+        help="only this collection, repeatable (default: all)",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--workers", type=int, default=4, help="collections seeded at once"
+    )
+    parser.add_argument("--no-indexes", action="store_true")
+    args = parser.parse_args(argv)
 
-def main():
-    for collection_key in MONGO_COLLECTIONS.keys():
-        json_file = DATA_FOLDER / f"{collection_key}.json"
+    keys = args.collection or list(MONGO_COLLECTIONS)
+    if not args.no_indexes:
+        # Unique indexes go first so duplicates in the data are rejected on
+        # insert; the others are faster to build after the load.
+        print(blue + "Creating unique indexes..." + reset)
+        if ensure_indexes(keys, unique=True):
+            print(red + "Unique indexes could not be created, nothing seeded." + reset)
+            return 1
 
-        print(blue + f"Processing {collection_key} from {json_file.name},..." + reset)
-        data = load_json(json_file)
-        seed_collection(collection_key, data)
+    started = time.perf_counter()
+    # Collections are independent, so they load side by side over the pool.
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        counts = list(
+            pool.map(lambda key: _seed_file(key, args.data, args.batch_size), keys)
+        )
+    elapsed = time.perf_counter() - started
+    total = sum(counts)
+    print(
+        yellow
+        + f"Inserted {total:,} document(s) in {elapsed:.1f}s"
+        + f" ({total / max(elapsed, 1e-9):,.0f} docs/s)"
+        + reset
+    )
 
+    if not args.no_indexes:
+        print(blue + "Creating indexes..." + reset)
+        if ensure_indexes(keys, unique=False):
+            print(red + "Some indexes could not be created." + reset)
+            return 1
     print(green + "Database seeding completed successfully!" + reset)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
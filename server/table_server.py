@@ -0,0 +1,352 @@
+# Multi-table blackjack server on asyncio: python -m server.table_server
+# Players connect with a line-based client (telnet / nc) and log in with
+# the same account checks as the terminal client.
+import argparse
+import asyncio
+import logging
+from game.art import render_hand
+from game.blackjack import STARTING_CHIPS, dealer_must_hit, hand_total
+from game.rules import RULE_VARIANTS
+from game.shoe import Shoe
+from user_login.login import (
+    check_user_password_async,
+    find_account,
+    load_admin_hashes,
+    log_table_login,
+)
+from utils.geolocation import locate
+from utils.hashing import current_cost
+from utils.two_factor import TwoFactorError, get_two_factor
+from utils.helpers import green, red, blue, yellow, reset
+
+LOGIN_TIMEOUT = 120
+BET_TIMEOUT = 20
+ACTION_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+class Disconnected(Exception):
+    pass
+
+
+class Player:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.user = None
+        self.chips = STARTING_CHIPS
+        self.left = asyncio.Event()
+
+    @property
+    def name(self):
+        return self.user["name"] if self.user else "guest"
+
+    async def send(self, text, end="\r\n"):
+        self.writer.write((text + end).encode())
+        await self.writer.drain()
+
+    async def ask(self, prompt, timeout, lower=True):
+        # Raises asyncio.TimeoutError if the player does not answer in time.
+        await self.send(prompt, end="")
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), timeout)
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            # A line over the stream limit: treat the client as gone.
+            raise Disconnected from e
+        if not line:
+            raise Disconnected
+        answer = line.decode(errors="ignore").strip()
+        return answer.lower() if lower else answer
+
+
+class Table:
+    def __init__(self, number, seats, rules):
+        self.number = number
+        self.max_seats = seats
+        self.rules = rules
+        self.shoe = Shoe(rules.decks)
+        self.seats = []
+        # Players who sat down mid-round join at the next one.
+        self.waiting = []
+        self.has_players = asyncio.Event()
+
+    @property
+    def players(self):
+        return len(self.seats) + len(self.waiting)
+
+    def join(self, player):
+        self.waiting.append(player)
+        self.has_players.set()
+
+    def leave(self, player):
+        for group in (self.seats, self.waiting):
+            if player in group:
+                group.remove(player)
+        player.left.set()
+
+    async def broadcast(self, text):
+        await asyncio.gather(*(self._send(player, text) for player in list(self.seats)))
+
+    async def _send(self, player, text):
+        try:
+            await player.send(text)
+        except (ConnectionError, Disconnected):
+            self.leave(player)
+
+    async def run(self):
+        while True:
+            self.seats += self.waiting
+            self.waiting.clear()
+            if not self.seats:
+                self.has_players.clear()
+                await self.has_players.wait()
+                continue
+            try:
+                await self.play_round()
+            except Exception:
+                # One broken round must not take the table (and every seated
+                # player) down with it.
+                logger.exception(red + f"Table {self.number}: round failed" + reset)
+                await asyncio.sleep(1)
+
+    async def _take_bet(self, player):
+        try:
+            answer = await player.ask(
+                green + f"Chips: {player.chips}. Bet (or 'leave'): " + reset,
+                BET_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            await self._send(player, blue + "\r\nNo bet, sitting this one out." + reset)
+            return 0
+        except (ConnectionError, Disconnected):
+            self.leave(player)
+            return 0
+
+        if answer in {"leave", "q", "quit"}:
+            await self._send(
+                player, blue + f"You leave with {player.chips} chips." + reset
+            )
+            self.leave(player)
+            return 0
+        if answer.isdigit() and 1 <= int(answer) <= player.chips:
+            return int(answer)
+        await self._send(player, red + "Invalid bet, sitting this one out." + reset)
+        return 0
+
+    async def _play_turn(self, player, hand, dealer, bet):
+        # Returns the final bet (doubled or not); stands on timeout.
+        while hand_total(hand) < 21:
+            can_double = len(hand) == 2 and bet * 2 <= player.chips
+            options = "(h)it, (s)tand" + (", (d)ouble" if can_double else "")
+            try:
+                action = await player.ask(
+                    green + f"{options}: " + reset, ACTION_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                await self._send(player, blue + "\r\nTime is up, standing." + reset)
+                break
+            except (ConnectionError, Disconnected):
+                self.leave(player)
+                break
+
+            if action in {"h", "hit"}:
+                hand.append(self.shoe.draw())
+            elif action in {"d", "double"} and can_double:
+                bet *= 2
+                hand.append(self.shoe.draw())
+                await self._send(player, self._view(player, hand, dealer))
+                break
+            elif action in {"s", "stand"}:
+                break
+            else:
+                await self._send(player, red + "Invalid choice." + reset)
+                continue
+            await self._send(player, self._view(player, hand, dealer))
+        return bet
+
+    def _view(self, player, hand, dealer, hide_hole=True):
+        dealer_total = "?" if hide_hole else hand_total(dealer)
+        return (
+            blue
+            + f"Dealer ({dealer_total}): "
+            + reset
+            + render_hand(dealer, hide_hole)
+            + green
+            + f"\r\n{player.name} ({hand_total(hand)}): "
+            + reset
+            + render_hand(hand)
+        )
+
+    def _settle(self, hand, dealer, bet, dealer_bj):
+        player_total, dealer_total = hand_total(hand), hand_total(dealer)
+        player_bj = len(hand) == 2 and player_total == 21
+        if player_bj and not dealer_bj:
+            return int(bet * self.rules.blackjack_pays), "Blackjack!"
+        if dealer_bj and not player_bj:
+            return -bet, "Dealer has blackjack."
+        if player_total > 21:
+            return -bet, f"Bust with {player_total}."
+        if dealer_total > 21 or player_total > dealer_total:
+            return bet, f"You win {bet}!"
+        if player_total < dealer_total:
+            return -bet, f"Dealer wins with {dealer_total}."
+        return 0, "Push."
+
+    async def play_round(self):
+        if self.shoe.needs_shuffle:
+            self.shoe.shuffle()
+            await self.broadcast(yellow + "Shuffling the shoe..." + reset)
+
+        seated = list(self.seats)
+        bets = await asyncio.gather(*(self._take_bet(player) for player in seated))
+        playing = [
+            (player, bet)
+            for player, bet in zip(seated, bets)
+            if bet and player in self.seats
+        ]
+        if not playing:
+            await asyncio.sleep(1)
+            return
+
+        hands = {player: [self.shoe.draw()] for player, _ in playing}
+        dealer = [self.shoe.draw()]
+        for hand in hands.values():
+            hand.append(self.shoe.draw())
+        dealer.append(self.shoe.draw())
+
+        dealer_bj = hand_total(dealer) == 21
+        final_bets = {}
+        for player, bet in playing:
+            final_bets[player] = bet
+            if player not in self.seats:
+                continue
+            await self._send(player, self._view(player, hands[player], dealer))
+            if not dealer_bj and hand_total(hands[player]) < 21:
+                await self.broadcast(blue + f"{player.name} is playing..." + reset)
+                final_bets[player] = await self._play_turn(
+                    player, hands[player], dealer, bet
+                )
+
+        if not dealer_bj and any(hand_total(hand) <= 21 for hand in hands.values()):
+            while dealer_must_hit(dealer, self.rules):
+                dealer.append(self.shoe.draw())
+
+        for player, _ in playing:
+            # Players who left mid-round still settle their bet.
+            won, message = self._settle(
+                hands[player], dealer, final_bets[player], dealer_bj
+            )
+            player.chips += won
+            await self._send(
+                player, self._view(player, hands[player], dealer, hide_hole=False)
+            )
+            await self._send(player, (green if won > 0 else red) + message + reset)
+            if player.chips <= 0 and player in self.seats:
+                await self._send(player, red + "You are out of chips." + reset)
+                self.leave(player)
+
+
+class TableServer:
+    def __init__(self, tables=10, seats=7, rules=RULE_VARIANTS["s17"]):
+        self.tables = [Table(number + 1, seats, rules) for number in range(tables)]
+
+    def free_table(self):
+        # Fill the busiest table that still has a seat, so games get going.
+        open_tables = [t for t in self.tables if t.players < t.max_seats]
+        return max(open_tables, key=lambda t: t.players, default=None)
+
+    async def login(self, player):
+        email = await player.ask("Enter your email: ", LOGIN_TIMEOUT)
+        password = await player.ask("Enter your password: ", LOGIN_TIMEOUT, lower=False)
+
+        # Database lookups run in threads, bcrypt on the hashing pool.
+        kind, account = await asyncio.to_thread(find_account, email)
+        if kind == "admin":
+            await player.send(red + "Admins log in with the terminal client." + reset)
+            return None
+        if kind is None:
+            await player.send(
+                red + "No account found with the provided credentials!" + reset
+            )
+            return None
+
+        ok, reason = await check_user_password_async(account, password)
+        if not ok:
+            await player.send(red + reason + reset)
+            return None
+
+        if account.get("2fa_method") == "email":
+            try:
+                await asyncio.to_thread(get_two_factor().send, email)
+                code = await player.ask(
+                    "Enter the 2FA code sent to your email: ", LOGIN_TIMEOUT
+                )
+                await asyncio.to_thread(get_two_factor().verify, email, code)
+            except TwoFactorError as e:
+                await player.send(red + f"2FA failed: {e}. Login denied." + reset)
+                return None
+
+        # The server's own hardware says nothing about the player: log the peer.
+        host, port = player.writer.get_extra_info("peername")[:2]
+        latitude, longitude = await asyncio.to_thread(locate, host)
+        peer = {"ip": host, "port": port, "latitude": latitude, "longitude": longitude}
+        await asyncio.to_thread(log_table_login, email, peer)
+        return account
+
+    async def handle(self, reader, writer):
+        player = Player(reader, writer)
+        try:
+            player.user = await self.login(player)
+            if not player.user:
+                return
+            table = self.free_table()
+            if table is None:
+                await player.send(red + "All tables are full, try again later." + reset)
+                return
+            await player.send(
+                green + f"Welcome {player.name}, table {table.number}." + reset
+            )
+            table.join(player)
+            await player.left.wait()
+        except (asyncio.TimeoutError, ConnectionError, Disconnected):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host, port):
+        await asyncio.to_thread(load_admin_hashes)
+        await asyncio.to_thread(current_cost)
+        table_tasks = [asyncio.create_task(table.run()) for table in self.tables]
+        server = await asyncio.start_server(self.handle, host, port)
+        print(green + f"Serving {len(self.tables)} tables on {host}:{port}" + reset)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in table_tasks:
+                task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m server.table_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--seats", type=int, default=7)
+    parser.add_argument("--variant", choices=list(RULE_VARIANTS), default="s17")
+    args = parser.parse_args(argv)
+
+    server = TableServer(args.tables, args.seats, RULE_VARIANTS[args.variant])
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(blue + "Server stopped." + reset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Mail queue against the local SMTP sink: python -m unittest tests.test_mailer
+import asyncio
+import threading
+import time
+import unittest
+from utils.mailer import MailQueue
+from utils.smtp_sink import SmtpSink
+
+
+class SinkServer:
+    """SmtpSink on an ephemeral port, served from a background event loop."""
+
+    def __init__(self):
+        self.sink = SmtpSink()
+        self.connections = 0
+        self.writers = set()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = self._run(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(5)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self.writers.add(writer)
+        try:
+            await self.sink.handle(reader, writer)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.writers.discard(writer)
+
+    def drop_connections(self):
+        # What a server timing out idle clients looks like to the mailer.
+        async def drop():
+            for writer in list(self.writers):
+                writer.close()
+
+        self._run(drop())
+        time.sleep(0.1)
+
+    def close(self):
+        async def shutdown():
+            self.server.close()
+            handlers = asyncio.all_tasks() - {asyncio.current_task()}
+            for task in handlers:
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+        self._run(shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+class MailQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.server = SinkServer()
+        settings = {
+            "host": "127.0.0.1",
+            "port": self.server.port,
+            "user": None,
+            "password": None,
+            "ssl": False,
+        }
+        self.mailer = MailQueue(workers=1, backoff=0.01, settings=settings)
+
+    def tearDown(self):
+        self.server.close()
+
+    def subjects(self):
+        return [message["Subject"] for _, _, message in self.server.sink.received]
+
+    def test_delivers_over_one_connection(self):
+        for number in range(3):
+            self.mailer.enqueue("player@example.com", f"Mail {number}", "<p>hi</p>")
+        self.assertTrue(self.mailer.flush(timeout=5))
+        self.assertEqual(self.subjects(), ["Mail 0", "Mail 1", "Mail 2"])
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.mailer.stats()["sent"], 3)
+
+    def test_reconnects_after_the_server_drops_the_connection(self):
+        self.mailer.enqueue("player@example.com", "Before", "body")
+        self.assertTrue(self.mailer.flush(timeout=5))
+        self.server.drop_connections()
+
+        self.mailer.enqueue("player@example.com", "After", "body")
+        self.assertTrue(self.mailer.flush(timeout=5))
+        self.assertEqual(self.subjects(), ["Before", "After"])
+        self.assertEqual(self.server.connections, 2)
+        stats = self.mailer.stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (2, 1, 0))
+
+    def test_bad_message_does_not_stop_the_worker(self):
+        # A str body that is not ASCII makes smtplib raise UnicodeEncodeError.
+        self.mailer.start()
+        self.mailer.queue.put(
+            {"sender": "a@b.c", "to": "x@y.z", "data": "café", "attempts": 0}
+        )
+        self.mailer.enqueue("player@example.com", "Still working", "body")
+        self.assertTrue(self.mailer.flush(timeout=5))
+        self.assertEqual(self.subjects(), ["Still working"])
+        stats = self.mailer.stats()
+        self.assertEqual((stats["sent"], stats["failed"]), (1, 1))
+        self.assertTrue(all(thread.is_alive() for thread in self.mailer.threads))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+# 2FA code stores: python -m unittest tests.test_two_factor
+# The Redis cases run against TWO_FA_TEST_REDIS_URL, or fakeredis when it is
+# installed (with lupa for the Lua script), and are skipped otherwise.
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+from utils import two_factor
+from utils.two_factor import (
+    LOCKED_REASON,
+    MemoryCodeStore,
+    RedisCodeStore,
+    TwoFactorError,
+    issue_code,
+    set_code_store,
+    verify_code,
+)
+
+ACCOUNT = "Player@Example.com"
+MAX_ATTEMPTS = 3
+WINDOW = 1
+
+
+def _redis_client():
+    url = os.getenv("TWO_FA_TEST_REDIS_URL")
+    try:
+        if url:
+            import redis
+
+            return redis.Redis.from_url(url)
+        import fakeredis
+
+        return fakeredis.FakeRedis()
+    except ImportError:
+        return None
+
+
+class CodeStoreBehaviour:
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+        set_code_store(self.store)
+        limits = mock.patch.multiple(
+            two_factor, TWO_FA_MAX_ATTEMPTS=MAX_ATTEMPTS, TWO_FA_LOCK_SECONDS=WINDOW
+        )
+        limits.start()
+        self.addCleanup(limits.stop)
+        self.addCleanup(set_code_store, None)
+
+    def test_correct_code_is_accepted_once(self):
+        code = issue_code(ACCOUNT)
+        self.assertEqual(
+            verify_code(ACCOUNT.lower(), code), (True, "2FA code verified")
+        )
+        ok, reason = verify_code(ACCOUNT, code)
+        self.assertFalse(ok)
+        self.assertIn("No valid 2FA code", reason)
+
+    def test_concurrent_verifications_accept_one(self):
+        code = issue_code(ACCOUNT)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(verify_code(ACCOUNT, code)))
+            for _ in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(ok for ok, _ in results), 1)
+
+    def test_wrong_code_counts_down_to_a_lock(self):
+        code = issue_code(ACCOUNT)
+        for _ in range(MAX_ATTEMPTS - 1):
+            self.assertEqual(
+                verify_code(ACCOUNT, "000000"), (False, "Invalid 2FA code")
+            )
+        self.assertEqual(verify_code(ACCOUNT, "000000"), (False, LOCKED_REASON))
+        # The code is gone and even the right one is refused while locked.
+        self.assertEqual(verify_code(ACCOUNT, code), (False, LOCKED_REASON))
+
+    def test_new_code_does_not_reset_failures(self):
+        issue_code(ACCOUNT)
+        for _ in range(MAX_ATTEMPTS - 1):
+            verify_code(ACCOUNT, "000000")
+        code = issue_code(ACCOUNT)
+        self.assertEqual(verify_code(ACCOUNT, "000000"), (False, LOCKED_REASON))
+        self.assertEqual(verify_code(ACCOUNT, code), (False, LOCKED_REASON))
+        with self.assertRaises(TwoFactorError):
+            issue_code(ACCOUNT)
+
+    def test_failures_expire_after_the_window(self):
+        issue_code(ACCOUNT)
+        for _ in range(MAX_ATTEMPTS):
+            verify_code(ACCOUNT, "000000")
+        time.sleep(WINDOW + 0.2)
+        code = issue_code(ACCOUNT)
+        self.assertEqual(verify_code(ACCOUNT, code), (True, "2FA code verified"))
+
+    def test_success_clears_failures(self):
+        code = issue_code(ACCOUNT)
+        verify_code(ACCOUNT, "000000")
+        verify_code(ACCOUNT, code)
+        self.assertEqual(self.store.failed(two_factor._key(ACCOUNT)), 0)
+
+    def test_code_expires(self):
+        code = issue_code(ACCOUNT, ttl=1)
+        time.sleep(1.2)
+        ok, reason = verify_code(ACCOUNT, code)
+        self.assertFalse(ok)
+        self.assertIn("No valid 2FA code", reason)
+
+
+class MemoryCodeStoreTest(CodeStoreBehaviour, unittest.TestCase):
+    def make_store(self):
+        return MemoryCodeStore()
+
+
+@unittest.skipIf(_redis_client() is None, "no Redis server or fakeredis")
+class RedisCodeStoreTest(CodeStoreBehaviour, unittest.TestCase):
+    def make_store(self):
+        client = _redis_client()
+        prefix = f"2fa-test:{os.getpid()}:{time.time_ns()}:"
+        self.addCleanup(
+            lambda: [client.delete(key) for key in client.scan_iter(prefix + "*")]
+        )
+        return RedisCodeStore(client, prefix)
+
+    def test_failure_counter_has_a_ttl(self):
+        issue_code(ACCOUNT)
+        verify_code(ACCOUNT, "000000")
+        name = f"{self.store.prefix}fail:{two_factor._key(ACCOUNT)}"
+        self.assertTrue(0 < self.store.client.ttl(name) <= WINDOW)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,9 @@
-from db.db_operations import find_documents, update_documents, delete_documents
+from db.db_operations import (
+    find_one_document,
+    iter_documents,
+    update_documents,
+    delete_documents,
+)
 from utils.auth import validation_input, bcrypt_hash, verify_password, input_masking
 from utils.helpers import (
     red,
@@ -53,23 +58,57 @@ def admin_login_menu(admin):
             sleep()
 
 
+USERS_PER_PAGE = 20
+
+
 def manage_users():
+    # One screen at a time by _id range: each page is a short indexed query
+    # and no cursor stays open while the menu waits for input.
+    page_starts = [None]
     while True:
         clear()
-        users = find_documents("users")
+        after = page_starts[-1]
+        users = list(
+            iter_documents(
+                "users",
+                {} if after is None else {"_id": {"$gt": after}},
+                projection={"name": 1, "email": 1},
+                sort_by=[("_id", 1)],
+                limit=USERS_PER_PAGE + 1,
+            )
+        )
+        more = len(users) > USERS_PER_PAGE
+        users = users[:USERS_PER_PAGE]
         if not users:
+            if len(page_starts) > 1:
+                # The rest of the list was deleted meanwhile.
+                page_starts.pop()
+                continue
             typing_effect(blue + "No user found" + reset)
             return
-        print(green + f"" + reset)
-        for idx, user in enumerate(users, start=1):
-            print(f"({idx} {user['name']} - {user['email']})")
-
-        print(f"({len(users) + 1} Back to main menu)")
 
-        choice = input_quit_handle("select a user or go back").strip()
-        if choice.isdigit() and 1 <= (choice) <= len(users):
-            manage_user_detail(user[int(choice) - 1])
-        elif choice == str(len(users) + 1):
+        for number, user in enumerate(users, 1):
+            print(f"({number} {user['name']} - {user['email']})")
+        if more:
+            print("(n Next page)")
+        if len(page_starts) > 1:
+            print("(p Previous page)")
+        print("(b Back to main menu)")
+
+        choice = input_quit_handle("select a user or go back").strip().lower()
+        if choice.isdigit() and 1 <= int(choice) <= len(users):
+            selected = find_one_document(
+                "users",
+                {"_id": users[int(choice) - 1]["_id"]},
+                {"password": 0, "sec_password": 0, "token": 0},
+            )
+            if selected:
+                manage_user_detail(selected)
+        elif choice == "n" and more:
+            page_starts.append(users[-1]["_id"])
+        elif choice == "p" and len(page_starts) > 1:
+            page_starts.pop()
+        elif choice == "b":
             return
         else:
             clear()
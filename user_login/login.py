@@ -1,11 +1,17 @@
-import bcrypt, requests
+import asyncio, threading, time
 from utils.auth import get_system_info, sha256_encrypt
 from user_login.user_menu import user_login_menu
 from user_login.admin_menu import admin_login_menu
-from db.db_operations import find_documents, update_documents
+from db.db_operations import (
+    distinct_values,
+    find_one_document,
+    update_documents,
+    update_one_document,
+)
 from utils.helpers import (
     input_quit_handle,
-    normalize_system_info,
+    read_input,
+    system_info_matches,
     typing_effect,
     current_time,
     sleep,
@@ -15,6 +21,63 @@ from utils.helpers import (
     reset,
 )
 from utils.auth import send_email, input_masking
+from utils.hashing import (
+    check_password,
+    check_password_async,
+    hash_password,
+    hash_password_async,
+    needs_rehash,
+)
+from utils.system_info import fingerprint_outdated
+from utils.two_factor import TwoFactorError, get_two_factor
+
+# Login entries kept per account in the log collections.
+MAX_LOGIN_HISTORY = 5
+
+# Login and the menus never read these back.
+ACCOUNT_PROJECTION = {"sec_password": 0, "token": 0}
+
+
+# Hashed names of every admin, so a login knows which collection to query.
+# Admins are few and rarely change; an unknown identifier reloads the set
+# (at most every ADMIN_RELOAD_SECONDS) to pick up admins added since.
+ADMIN_RELOAD_SECONDS = 30
+_admin_hashes = {"names": None, "loaded": 0.0}
+_admin_lock = threading.Lock()
+
+
+def load_admin_hashes(force=False):
+    with _admin_lock:
+        stale = time.monotonic() - _admin_hashes["loaded"] >= ADMIN_RELOAD_SECONDS
+        if _admin_hashes["names"] is None or (force and stale):
+            names = distinct_values("admin", "name")
+            if names is None:
+                # Failed read: keep what we had (nothing on a first load)
+                # so the next call tries again instead of caching it.
+                return _admin_hashes["names"] or set()
+            _admin_hashes["names"] = set(names)
+            _admin_hashes["loaded"] = time.monotonic()
+        return _admin_hashes["names"]
+
+
+def find_account(identifier):
+    # Returns ("admin", doc), ("user", doc) or (None, None), with one
+    # indexed lookup for any known account.
+    name_hash = sha256_encrypt(identifier)
+    if name_hash in load_admin_hashes():
+        admin = find_one_document("admin", {"name": name_hash}, ACCOUNT_PROJECTION)
+        if admin:
+            return "admin", admin
+
+    user = find_one_document("users", {"email": identifier}, ACCOUNT_PROJECTION)
+    if user:
+        return "user", user
+
+    if name_hash in load_admin_hashes(force=True):
+        admin = find_one_document("admin", {"name": name_hash}, ACCOUNT_PROJECTION)
+        if admin:
+            return "admin", admin
+    return None, None
 
 
 def login():
@@ -22,30 +85,115 @@ def login():
     identifier = input_quit_handle("Enter your email: ").lower()
     password = input_masking("Enter your password: ")
 
-    hashed_name = sha256_encrypt(identifier)
-
-    # Check if the user is an admin
-    admin = find_documents("admin", {"name": hashed_name})
-    if admin:
-        admin = admin[0]
-        return admin_login_flow(admin, password)
-
-    # Check if the user is a regular user
-    user = find_documents("users", {"email": identifier})
-    if user:
-        user = user[0]
-        return user_login_flow(user, password)
+    kind, account = find_account(identifier)
+    if kind == "admin":
+        return admin_login_flow(account, password)
+    if kind == "user":
+        return user_login_flow(account, password)
 
     typing_effect(red + "No account found with the provided credentials!" + reset)
     sleep()
     return
 
 
+LOCKED_MESSAGE = "Your account is locked due to failed login attempts."
+MAX_LOGIN_ATTEMPTS = 3
+# Matches accounts that are not locked, including ones never failed.
+NOT_LOCKED = {"login_attempts": {"$not": {"$gte": MAX_LOGIN_ATTEMPTS}}}
+
+
+def _account_locked(user):
+    # Read the counter fresh: the account document was fetched before the
+    # password check, and parallel logins may have failed since.
+    current = find_one_document(
+        "users", {"email": user["email"]}, {"login_attempts": 1}
+    )
+    if (current or user).get("login_attempts", 0) >= MAX_LOGIN_ATTEMPTS:
+        send_email(
+            user["email"],
+            "Account Locked",
+            "Your account has been locked due to suspicious login attempts.",
+        )
+        return True
+    return False
+
+
+def _record_password_check(user, ok, new_hash=None):
+    # Stores the outcome: one more failed attempt, or a reset counter (and
+    # the hash moved to the current work factor). Returns (ok, reason).
+    # Both are single atomic updates, so concurrent guesses are all counted
+    # and a correct password cannot unlock an account locked meanwhile.
+    if not ok:
+        updated = update_one_document(
+            "users",
+            {"email": user["email"]},
+            {"$inc": {"login_attempts": 1}},
+            {"login_attempts": 1},
+        )
+        attempts = updated["login_attempts"] if updated else MAX_LOGIN_ATTEMPTS
+        if attempts >= MAX_LOGIN_ATTEMPTS:
+            return False, LOCKED_MESSAGE
+        remaining = MAX_LOGIN_ATTEMPTS - attempts
+        return False, f"Incorrect password! Attempts remaining: {remaining}"
+
+    changes = {"login_attempts": 0}
+    if new_hash:
+        changes["password"] = new_hash
+    updated = update_one_document(
+        "users", {"email": user["email"], **NOT_LOCKED}, {"$set": changes}, {"_id": 1}
+    )
+    if updated is None:
+        return False, LOCKED_MESSAGE
+    return True, None
+
+
+def check_user_password(user, password):
+    # Returns (True, None) or (False, reason); counts failed attempts.
+    if _account_locked(user):
+        return False, LOCKED_MESSAGE
+    ok = check_password(password, user["password"])
+    rehash = ok and needs_rehash(user["password"])
+    return _record_password_check(user, ok, hash_password(password) if rehash else None)
+
+
+async def check_user_password_async(user, password):
+    # check_user_password for the event loop: bcrypt is awaited on the
+    # hashing pool and the database update runs in a thread.
+    if _account_locked(user):
+        return False, LOCKED_MESSAGE
+    ok = await check_password_async(password, user["password"])
+    new_hash = None
+    if ok and needs_rehash(user["password"]):
+        new_hash = await hash_password_async(password)
+    return await asyncio.to_thread(_record_password_check, user, ok, new_hash)
+
+
+def _email_code_check(email):
+    # Mails a 2FA code and prompts for it; True once it is verified.
+    print(blue + "Sending 2FA code to your email..." + reset)
+    try:
+        get_two_factor().send(email)
+    except TwoFactorError as e:
+        typing_effect(red + f"Error sending 2FA code: {str(e)}. Login denied." + reset)
+        return False
+
+    # Prompt for the code and verify it
+    code = read_input("Enter the 2FA code sent to your email: ").strip()
+    try:
+        get_two_factor().verify(email, code)
+    except TwoFactorError as e:
+        print(red + f"2FA verification failed: {str(e)}. Login denied." + reset)
+        return False
+
+    print(green + "2FA verification successful!" + reset)
+    return True
+
+
 def admin_login_flow(admin, password):
     print(blue + "Admin Login Detected" + reset)
 
     # Admins have only 1 attempt
-    if not bcrypt.checkpw(password.encode(), admin["password"].encode()):
+    if not check_password(password, admin["password"]):
         print(red + "Incorrect password! Your account is locked." + reset)
         send_email(
             admin["email"],
@@ -53,44 +201,14 @@ def admin_login_flow(admin, password):
             "Your admin account has been locked due to failed login attempts.",
         )
         return
+    if needs_rehash(admin["password"]):
+        update_documents(
+            "admin", {"name": admin["name"]}, {"password": hash_password(password)}
+        )
 
     if admin.get("2fa_method") == "email":
-        print(blue + "Sending 2FA code to your email..." + reset)
-        try:
-            # Initiate 2FA flow using Flask backend
-            response = requests.post(
-                "http://127.0.0.1:5000/send-2fa", json={"email": admin["email"]}
-            )
-            response.raise_for_status()
-        except requests.RequestException as e:
-            typing_effect(
-                red
-                + f"Error sending 2FA code: {str(e)}. Login denied. flask offline"
-                + reset
-            )
-            return
-
-        # Retrieve the expected 2FA code
-        expected_code = response.json().get("code")
-        if not expected_code:
-            print(red + "Failed to retrieve 2FA code from server." + reset)
-            return
-
-        # Prompt admin to enter the code
-        code = input("Enter the 2FA code sent to your email: ").strip()
-
-        # Verify the 2FA code
-        try:
-            verification_response = requests.post(
-                "http://127.0.0.1:5000/verify-2fa",
-                json={"code": code, "expected_code": expected_code},
-            )
-            verification_response.raise_for_status()
-        except requests.RequestException as e:
-            print(red + f"2FA verification failed: {str(e)}. Login denied." + reset)
+        if not _email_code_check(admin["email"]):
             return
-
-        print(green + "2FA verification successful!" + reset)
     elif admin.get("2fa_method") == "none":
         print(blue + "2FA is disabled for this account." + reset)
     else:
@@ -100,7 +218,9 @@ def admin_login_flow(admin, password):
     system_info = get_system_info()
 
     # Fetch Last Login Log
-    last_log = find_documents("admin_log", {"name": admin["name"]})
+    last_log = find_one_document(
+        "admin_log", {"name": admin["name"]}, {"system_info": 1}
+    )
 
     # Check if last log exists
     if not last_log:
@@ -109,13 +229,24 @@ def admin_login_flow(admin, password):
         admin_login_menu(admin)
         return
 
-    # Normalize system info for comparison
-
-    normalized_system_info = normalize_system_info(system_info)
-    normalized_last_log = normalize_system_info(last_log.get("system_info", {}))
+    # Fingerprints stored before the probes changed cannot match. For most
+    # admins the fingerprint is the second factor, so enrolling this
+    # machine takes an emailed code unless one was just checked above.
+    if fingerprint_outdated(last_log.get("system_info", {})):
+        print(
+            blue
+            + "Device fingerprint format updated, re-enrolling this machine."
+            + reset
+        )
+        if admin.get("2fa_method") != "email" and not _email_code_check(admin["email"]):
+            return
+        log_login_time("admin_log", admin["name"], system_info)
+        admin_login_menu(admin)
+        return
 
     # Compare System Info
-    if normalized_system_info != normalized_last_log:
+    stored_info = last_log.get("system_info", {})
+    if not system_info_matches(system_info, stored_info):
         typing_effect(red + "System info mismatch! Your account is locked." + reset)
 
         send_email(
@@ -125,73 +256,41 @@ def admin_login_flow(admin, password):
         )
         return
 
+    if system_info.get("latitude") == "Unknown":
+        # Not resolved yet: keep the known location rather than erase it.
+        for key in ("latitude", "longitude"):
+            system_info[key] = stored_info.get(key, "Unknown")
+    log_login_time("admin_log", admin["name"], system_info)
+
     # Proceed to Admin Menu
     admin_login_menu(admin)
 
 
 def user_login_flow(user, password):
     print(blue + "User Login Detected" + reset)
-    login_attempts = user.get("login_attempts", 0)
-
-    if login_attempts >= 3:
-        print(red + "Your account is locked due to failed login attempts." + reset)
-        send_email(
-            user["email"],
-            "Account Locked",
-            "Your account has been locked due to suspicious login attempts.",
-        )
+    ok, reason = check_user_password(user, password)
+    if not ok:
+        typing_effect(red + reason + reset)
         return
 
-    # Verify Password
-    if not bcrypt.checkpw(password.encode(), user["password"].encode()):
-        login_attempts += 1
-        update_documents(
-            "users",
-            {"email": user["email"]},
-            {"$set": {"login_attempts": login_attempts}},
-        )
-        typing_effect(
-            red
-            + f"Incorrect password! Attempts remaining: {3 - login_attempts}"
-            + reset
-        )
-        return
-
-    # Reset login attempts after successful password verification
-    update_documents("users", {"email": user["email"]}, {"$set": {"login_attempts": 0}})
-
     system_info = get_system_info()
 
     # 2FA Flow if system info changes and 2FA is enabled
     if user.get("2fa_method") == "email":
-        # Initiate 2FA flow using Flask backend
         print(blue + "Sending 2FA code to your email..." + reset)
         try:
-            response = requests.post(
-                "http://127.0.0.1:5000/send-2fa", json={"email": user["email"]}
-            )
-            response.raise_for_status()
-        except requests.RequestException as e:
+            get_two_factor().send(user["email"])
+        except TwoFactorError as e:
             print(red + f"Error sending 2FA code: {str(e)}. Login denied." + reset)
             return
 
-        # Retrieve the expected 2FA code
-        expected_code = response.json().get("code")
-        if not expected_code:
-            print(red + "Failed to retrieve 2FA code from server." + reset)
-            return
-
         # Prompt user to enter the code
-        code = input("Enter the 2FA code sent to your email: ").strip()
+        code = read_input("Enter the 2FA code sent to your email: ").strip()
 
         # Verify the 2FA code
         try:
-            verification_response = requests.post(
-                "http://127.0.0.1:5000/verify-2fa",
-                json={"code": code, "expected_code": expected_code},
-            )
-            verification_response.raise_for_status()
-        except requests.RequestException as e:
+            get_two_factor().verify(user["email"], code)
+        except TwoFactorError as e:
             typing_effect(
                 red + f"2FA verification failed: {str(e)}. Login denied." + reset
             )
@@ -212,26 +311,31 @@ def user_login_flow(user, password):
 
 
 def log_login_time(log_collection, identifier, system_info):
-    logs = find_documents(
+    # One atomic upsert: append this login and keep only the newest
+    # MAX_LOGIN_HISTORY, so concurrent sessions cannot drop each other's entries.
+    query = (
+        {"email": identifier} if log_collection == "user_log" else {"name": identifier}
+    )
+    entry = {"time": current_time(), "system_info": system_info}
+    update_documents(
         log_collection,
-        {"email": identifier} if log_collection == "user_log" else {"name": identifier},
+        query,
+        {
+            "$push": {"login_times": {"$each": [entry], "$slice": -MAX_LOGIN_HISTORY}},
+            "$set": {"system_info": system_info},
+        },
+        upsert=True,
     )
-    log = logs[-1] if logs else None  # Use None if no logs exist
 
-    login_times = (
-        log.get("login_times", [])[-4:] if log else []
-    )  # Default to empty list if no log
-    login_times.append({"time": current_time()})
 
-    if log:
-        update_documents(
-            log_collection,
-            (
-                {"email": identifier}
-                if log_collection == "user_log"
-                else {"name": identifier}
-            ),
-            {"$set": {"login_times": login_times}},
-        )
-    else:
-        return
+def log_table_login(email, peer):
+    # Table server logins: the peer's address says nothing about the
+    # player's machine, so they go under their own key and leave the
+    # login_times history and system_info fingerprint alone.
+    entry = {"time": current_time(), **peer}
+    update_documents(
+        "user_log",
+        {"email": email},
+        {"$push": {"table_logins": {"$each": [entry], "$slice": -MAX_LOGIN_HISTORY}}},
+        upsert=True,
+    )
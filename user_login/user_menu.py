@@ -1,4 +1,9 @@
-from db.db_operations import find_documents, update_documents, delete_documents
+from db.db_operations import (
+    find_one_document,
+    iter_documents,
+    update_documents,
+    delete_documents,
+)
 from utils.auth import validation_input, bcrypt_hash, verify_password, input_masking
 from game.blackjack import blackjack
 from utils.helpers import (
@@ -16,9 +21,16 @@ from utils.helpers import (
 
 # Main login
 def user_login_menu(user):
-    last_login = find_documents("user_log", {"email": user["email"]})
-    if last_login and "login_times" in last_login[-1]:
-        last_login_time = last_login[-1]["login_times"][-1].get(
+    # Only the newest login entry; including email keeps $slice from
+    # returning every other field of the log.
+    last_login = find_one_document(
+        "user_log",
+        {"email": user["email"]},
+        {"_id": 0, "email": 1, "login_times": {"$slice": -1}},
+        sort_by=[("_id", -1)],
+    )
+    if last_login and last_login.get("login_times"):
+        last_login_time = last_login["login_times"][-1].get(
             "time", "Time not available"
         )
     else:
@@ -44,7 +56,7 @@ def user_login_menu(user):
 
         if action == "1":
             clear()
-            blackjack()
+            blackjack(user)
         elif action == "2":
             clear()
             account_details(user)
@@ -174,21 +186,30 @@ def change_password(user_email):
 
 
 def view_locations(user_email):
-    user_logs = find_documents("user_log", {"email": user_email})
-    if user_logs:
-        print(green + "Previous login locations:" + reset)
-        for log in user_logs:
-            if "login_times" in log:
-                for entry in log["login_times"]:
-                    system_info = entry.get("system_info", {})
-                    latitude = system_info.get("latitude", "Unknown")
-                    longitude = system_info.get("longitude", "Unknown")
-                    location = f"Lat: {latitude}, Lon: {longitude}"
-                    time = entry.get("time", "Time not available")
-                    print(f" - Location: {location}, Date: {time}")
-            else:
-                print(red + "No login times found in this log." + reset)
-    else:
+    found = False
+    for log in iter_documents(
+        "user_log",
+        {"email": user_email},
+        projection={"login_times": 1, "table_logins": 1, "_id": 0},
+    ):
+        if not found:
+            print(green + "Previous login locations:" + reset)
+            found = True
+        if "login_times" in log:
+            for entry in log["login_times"]:
+                system_info = entry.get("system_info", {})
+                latitude = system_info.get("latitude", "Unknown")
+                longitude = system_info.get("longitude", "Unknown")
+                location = f"Lat: {latitude}, Lon: {longitude}"
+                time = entry.get("time", "Time not available")
+                print(f" - Location: {location}, Date: {time}")
+        else:
+            print(red + "No login times found in this log." + reset)
+        for entry in log.get("table_logins", []):
+            location = f"Lat: {entry.get('latitude')}, Lon: {entry.get('longitude')}"
+            time = entry.get("time", "Time not available")
+            print(f" - Table server from {entry.get('ip')}: {location}, Date: {time}")
+    if not found:
         print(red + "No login locations found." + reset)
 
     choice = input_quit_handle(green + "(1) Return to menu\n" "Enter your choice: ")
@@ -204,7 +225,7 @@ def delete_user_and_log(user):
 
 
 def delete_account(user_email):
-    user = find_documents("users", {"email": user_email})[0]
+    user = find_one_document("users", {"email": user_email}, {"name": 1})
     clear()
     confirm_email = (
         input_quit_handle(red + "To confirm, please re-enter your email: " + reset)
@@ -0,0 +1,223 @@
+# Bulk user import/export for admins: python user_transfer.py --help
+#   python user_transfer.py import partners.csv --rejects rejects.ndjson
+#   python user_transfer.py export users.ndjson --include-hashes
+#   python user_transfer.py import users.ndjson --hashed
+
+import argparse
+import csv
+import re
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from bson import json_util
+from db.db_operations import find_documents, insert_documents, iter_documents
+from db.json_files import load_json
+from utils.auth import validate_payloads
+from utils.hashing import current_cost, hash_passwords
+from utils.helpers import green, red, blue, yellow, reset
+
+CHUNK_SIZE = 1000
+EXPORT_FIELDS = ["name", "surname", "email", "phone", "role", "2fa_method"]
+SECRET_FIELDS = ("password", "sec_password", "token")
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+def _format(path: Path, override=None):
+    return override or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+
+
+def read_records(path: Path, file_format=None):
+    if _format(path, file_format) == "csv":
+        with open(path, newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
+    else:
+        yield from load_json(path)
+
+
+def _redact(record):
+    # Rejected records are written out without their passwords.
+    return {key: value for key, value in record.items() if key not in SECRET_FIELDS}
+
+
+def _reject(rejects, line, errors, record):
+    # The input record goes under its own key, so none of its fields can
+    # shadow the line number or the errors.
+    if rejects:
+        entry = {"line": line, "errors": errors, "record": _redact(record)}
+        rejects.write(json_util.dumps(entry) + "\n")
+
+
+def import_chunk(records, start, seen, rejects, cost, hashed=False):
+    # One chunk: validate, drop duplicates (one $in query), hash, insert.
+    # Returns (inserted, duplicates, invalid).
+    valid, invalid = [], 0
+    for index, user, errors in validate_payloads(records):
+        if not errors and not hashed:
+            # Without --hashed a bcrypt-looking password is refused rather
+            # than stored as is: only a trusted export may carry hashes.
+            errors = {
+                field: "looks like a bcrypt hash; use --hashed for a trusted export"
+                for field in ("password", "sec_password")
+                if BCRYPT_HASH.match(getattr(user, field))
+            }
+        if errors:
+            invalid += 1
+            _reject(rejects, start + index + 1, errors, records[index])
+            continue
+        valid.append(user)
+
+    emails = list({user.email.lower() for user in valid})
+    existing = {
+        user["email"]
+        for user in find_documents(
+            "users", {"email": {"$in": emails}}, projection={"email": 1, "_id": 0}
+        )
+    }
+    fresh = []
+    for user in valid:
+        email = user.email.lower()
+        if email in existing or email in seen:
+            continue
+        seen.add(email)
+        fresh.append(user)
+    duplicates = len(valid) - len(fresh)
+    if not fresh:
+        return 0, duplicates, invalid
+
+    # With --hashed, hashes exported from here (or a partner's bcrypt) are
+    # kept as they are; anything else is hashed.
+    secrets = [
+        secret for user in fresh for secret in (user.password, user.sec_password)
+    ]
+    plain = [
+        i
+        for i, secret in enumerate(secrets)
+        if not (hashed and BCRYPT_HASH.match(secret))
+    ]
+    for i, digest in zip(plain, hash_passwords([secrets[i] for i in plain], cost)):
+        secrets[i] = digest
+    documents = [
+        {
+            "name": user.name,
+            "surname": user.surname,
+            "email": user.email.lower(),
+            "phone": user.phone,
+            "password": secrets[2 * i],
+            "sec_password": secrets[2 * i + 1],
+            "role": "user",
+        }
+        for i, user in enumerate(fresh)
+    ]
+    return insert_documents("users", documents, ordered=False), duplicates, invalid
+
+
+def import_users(
+    path, file_format=None, chunk=CHUNK_SIZE, rejects=None, cost=None, hashed=False
+):
+    # Emails seen earlier in this file, so in-file duplicates are skipped too.
+    seen = set()
+    totals = [0, 0, 0]
+    records = read_records(path, file_format)
+    started = time.perf_counter()
+    rejects_file = open(rejects, "w", encoding="utf-8") if rejects else None
+    try:
+        start = 0
+        while batch := list(islice(records, chunk)):
+            counts = import_chunk(batch, start, seen, rejects_file, cost, hashed)
+            totals = [total + count for total, count in zip(totals, counts)]
+            start += len(batch)
+            rate = start / (time.perf_counter() - started)
+            print(
+                blue
+                + f"{start:>10,} read  {totals[0]:,} imported  {totals[1]:,} duplicate"
+                + f"  {totals[2]:,} invalid  ({rate:,.0f} records/s)"
+                + reset
+            )
+    finally:
+        if rejects_file:
+            rejects_file.close()
+    return tuple(totals)
+
+
+def export_users(path, file_format=None, include_hashes=False):
+    projection = None if include_hashes else {field: 0 for field in SECRET_FIELDS}
+    users = iter_documents("users", projection=projection)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if _format(path, file_format) == "csv":
+            fields = EXPORT_FIELDS + (
+                ["password", "sec_password"] if include_hashes else []
+            )
+            writer = csv.DictWriter(file, fields, extrasaction="ignore")
+            writer.writeheader()
+            for user in users:
+                writer.writerow(user)
+                count += 1
+        else:
+            for user in users:
+                file.write(json_util.dumps(user) + "\n")
+                count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python user_transfer.py",
+        description="Import or export users as NDJSON or CSV.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importing = commands.add_parser("import", help="create users from a file")
+    importing.add_argument("path", type=Path)
+    importing.add_argument("--format", choices=["ndjson", "csv"])
+    importing.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    importing.add_argument(
+        "--rejects", type=Path, help="write invalid records here (NDJSON)"
+    )
+    importing.add_argument(
+        "--cost",
+        type=int,
+        default=None,
+        help="bcrypt cost for imported hashes; lower ones are upgraded at login",
+    )
+    importing.add_argument(
+        "--hashed",
+        action="store_true",
+        help="the file is a trusted export: keep bcrypt hashes as they are",
+    )
+
+    exporting = commands.add_parser("export", help="write all users to a file")
+    exporting.add_argument("path", type=Path)
+    exporting.add_argument("--format", choices=["ndjson", "csv"])
+    exporting.add_argument("--include-hashes", action="store_true")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "import":
+        if not args.path.exists():
+            print(red + f"File {args.path} does not exists!" + reset)
+            return 1
+        print(
+            blue
+            + f"Importing users (bcrypt cost {args.cost or current_cost()})..."
+            + reset
+        )
+        inserted, duplicates, invalid = import_users(
+            args.path, args.format, args.chunk, args.rejects, args.cost, args.hashed
+        )
+        print(
+            green
+            + f"Imported {inserted:,} user(s); skipped {duplicates:,} duplicate(s)"
+            + f" and {invalid:,} invalid record(s)"
+            + reset
+        )
+    else:
+        count = export_users(args.path, args.format, args.include_hashes)
+        print(green + f"Exported {count:,} user(s) to {args.path}" + reset)
+    print(yellow + f"Done in {time.perf_counter() - started:.1f}s" + reset)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,37 @@
 import hashlib
-import bcrypt
 import json
-import smtplib
-import requests
-import platform
-import subprocess
 from pathlib import Path
 from colorama import Style
-from email.mime.text import MIMEText
-import os, re, time, getpass, msvcrt
+import os, time, getpass
 from models.all_models import RegisterModel
-from db.db_operations import find_documents
-from email.mime.multipart import MIMEMultipart
-from pydantic import ValidationError, BaseModel
+from db.db_operations import find_documents, find_one_document, document_exists
+from functools import lru_cache
+from typing import Annotated
+from pydantic import TypeAdapter, ValidationError
 from register.email_confirm import generate_confirmation_token, confirm_token
-from utils.helpers import green, red, blue, reset, input_quit_handle
+from utils.hashing import check_password, hash_password
+from utils.mailer import send_mail
+from utils.system_info import get_system_info
+from utils.helpers import (
+    green,
+    red,
+    blue,
+    reset,
+    input_quit_handle,
+    is_headless,
+    read_input,
+)
+
+# msvcrt only exists on Windows.
+if os.name == "nt":
+    import msvcrt
 
 
 def input_masking(prompt, delay=0.02, typing_effect=False, color=None):
+    # Scripted runs: no masking, no typing delay.
+    if is_headless():
+        return read_input(prompt)
+
     try:
         delay = float(delay)
     except ValueError:
@@ -72,17 +86,16 @@ def sha256_encrypt(data: str) -> str:
 
 
 def bcrypt_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return hash_password(password)
 
 
 def verify_password(user_email, password):
-    user = find_documents("users", {"email": user_email})
+    user = find_one_document("users", {"email": user_email}, {"password": 1})
 
     if user:
-        user = user[0]
         hashed_password = user["password"]
 
-        if bcrypt.checkpw(password.encode(), hashed_password.encode()):
+        if check_password(password, hashed_password):
             return True
         else:
             return False
@@ -91,119 +104,6 @@ def verify_password(user_email, password):
         return False
 
 
-def get_system_info():
-    try:
-        # MAC Addresses
-        mac_addresses = []
-        try:
-            if platform.system() == "Windows":
-                # Windows: Get MAC addresses using PowerShell
-                command = (
-                    'powershell -Command "Get-NetAdapter | '
-                    'Select-Object -ExpandProperty MacAddress"'
-                )
-                output = subprocess.check_output(command, shell=True).decode().strip()
-                mac_addresses = [
-                    mac.replace("-", ":").strip() for mac in output.splitlines() if mac
-                ]
-            else:
-                # Linux/Mac: Get MAC addresses using ip link or ifconfig
-                try:
-                    output = subprocess.check_output("ip link", shell=True).decode()
-                    mac_matches = re.findall(
-                        r"([0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}", output
-                    )
-                    mac_addresses = list(set(mac_matches))
-                except Exception:
-                    output = subprocess.check_output("ifconfig", shell=True).decode()
-                    mac_matches = re.findall(
-                        r"([0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}", output
-                    )
-                    mac_addresses = list(set(mac_matches))
-            mac_addresses = list(filter(None, mac_addresses))  # Remove empty entries
-        except Exception as e:
-            print(red + f"Error fetching MAC addresses: {e}" + reset)
-
-        # Drives (HDD/SSD Serial Numbers)
-        drives = []
-        try:
-            if platform.system() == "Windows":
-                # Windows: Get drives using WMIC
-                output = subprocess.check_output(
-                    "wmic diskdrive get SerialNumber,Model", shell=True
-                ).decode()
-                for line in output.splitlines()[1:]:
-                    if line.strip():
-                        model, serial = line.strip().rsplit(None, 1)
-                        drives.append({"model": model, "serial": serial})
-            else:
-                # Linux: Get drives using lsblk
-                output = subprocess.check_output(
-                    "lsblk -o NAME,SERIAL", shell=True
-                ).decode()
-                for line in output.splitlines()[1:]:
-                    if line.strip():
-                        parts = line.split()
-                        if len(parts) == 2:
-                            drives.append({"model": parts[0], "serial": parts[1]})
-        except Exception as e:
-            print(red + f"Error fetching HDD/SSD serial numbers: {e}" + reset)
-
-        # Motherboard Serial Number
-        motherboard_serial = "Unknown"
-        try:
-            if platform.system() == "Windows":
-                # Windows: Get motherboard serial using WMIC
-                motherboard_serial = (
-                    subprocess.check_output(
-                        "wmic baseboard get serialnumber", shell=True
-                    )
-                    .decode()
-                    .split("\n")[1]
-                    .strip()
-                )
-            else:
-                # Linux: Read from system files
-                motherboard_serial = (
-                    subprocess.check_output(
-                        "cat /sys/class/dmi/id/board_serial", shell=True
-                    )
-                    .decode()
-                    .strip()
-                )
-        except Exception as e:
-            print(red + f"Error fetching motherboard serial: {e}" + reset)
-
-        # Location (Latitude and Longitude)
-        latitude, longitude = "Unknown", "Unknown"
-        try:
-            response = requests.get("https://ipinfo.io/json", timeout=5)
-            if response.status_code == 200:
-                location = response.json().get("loc", "Unknown")
-                if location != "Unknown":
-                    latitude, longitude = location.split(",")
-        except Exception as e:
-            print(red + f"Error fetching location: {e}" + reset)
-
-        # Return System Info
-        return {
-            "mac_addresses": mac_addresses,
-            "drives": drives,
-            "motherboard_serial": motherboard_serial,
-            "latitude": latitude,
-            "longitude": longitude,
-        }
-    except Exception as e:
-        print(f"Error fetching system info: {e}")
-        return {
-            "mac_addresses": [],
-            "drives": [],
-            "motherboard_serial": "Unknown",
-            "latitude": "Unknown",
-            "longitude": "Unknown",
-        }
-
-
 def encrypt_data(data: dict) -> dict:
     encrypted_data = {}
     for key, value in data.items():
@@ -228,24 +128,44 @@ def store_log(data: dict, file_path: Path):
     print(f"Admin log stored securely at {file_path}")
 
 
+@lru_cache(maxsize=None)
+def _field_adapter(model, field_name: str):
+    # Compiled once per (model, field), with the field's own constraints.
+    field = model.model_fields[field_name]
+    return TypeAdapter(Annotated[field.annotation, field])
+
+
 def validation_field(field_name: str, value: str, model=RegisterModel):
 
     if field_name not in model.model_fields:
         return blue + f"Unknown field: {field_name}{reset}"
 
-    field_type = model.model_fields[field_name].annotation
-
-    class TempModel(BaseModel):
-        __annotations__ = {field_name: field_type}
-
     try:
-        TempModel(**{field_name: value})
+        _field_adapter(model, field_name).validate_python(value)
         return True
     except ValidationError as e:
         error_message = e.errors()[0]["msg"]
         return red + f"Validation error for '{field_name}': {error_message}{reset}"
 
 
+def validate_payload(payload: dict, model=RegisterModel):
+    # Whole record in one pass: (instance, None) or (None, {field: message}).
+    try:
+        return model.model_validate(payload), None
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors():
+            field = ".".join(str(part) for part in error["loc"]) or "__root__"
+            errors.setdefault(field, error["msg"])
+        return None, errors
+
+
+def validate_payloads(payloads, model=RegisterModel):
+    # Streams (index, instance, errors) for an iterable of records.
+    for index, payload in enumerate(payloads):
+        yield index, *validate_payload(payload, model)
+
+
 def validation_input(prompt, field_name, min_length=None, model=RegisterModel):
     while True:
         user_input = input_quit_handle(prompt).strip()
@@ -267,29 +187,13 @@ def validation_input(prompt, field_name, min_length=None, model=RegisterModel):
 def check_user_exists(email):
 
     email = email.strip()
-    existing_user = find_documents("users", {"email": email})
-    return len(existing_user) > 0
+    return document_exists("users", {"email": email})
 
 
 def send_email(to_email, subject, body):
-    try:
-        smtp_host = os.getenv("SMTP_HOST")
-        smtp_port = os.getenv("SMTP_PORT")
-        smtp_user = os.getenv("SMTP_USER")
-        smtp_pass = os.getenv("SMTP_PASS")
-
-        message = MIMEMultipart()
-        message["From"] = smtp_user
-        message["To"] = to_email
-        message["Subject"] = subject
-        message.attach(MIMEText(body, "html"))
-
-        with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(smtp_user, to_email, message.as_string())
-            print(green + "Confirmation email sent successfully!" + reset)
-    except Exception as e:
-        print(red + f"Error sending email: {e}" + reset)
+    # Queued for the mail workers; returns without waiting on SMTP.
+    send_mail(to_email, subject, body)
+    print(green + "Email queued for delivery!" + reset)
 
 
 def email_confirmation(email):
@@ -0,0 +1,281 @@
+# Login geolocation without waiting on the network.
+# A Geolocator answers from an LRU+TTL cache keyed by public IP (persisted
+# to disk; this machine's own entry is kept in memory, briefly), then from an optional offline IP-range database; misses are
+# fetched from the remote provider in the background (on a small shared
+# pool) for the next login.
+# GEO_PROVIDER picks the remote side: "ipinfo" (default), "offline" (no
+# network, GEO_DB_PATH only) or "stub" (fixed answer, for tests).
+import atexit
+import bisect
+import csv
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+from utils.helpers import red, reset
+
+UNKNOWN = ("Unknown", "Unknown")
+GEO_CACHE_PATH = Path(
+    os.getenv("GEO_CACHE_PATH", Path.home() / ".cache" / "blackjack" / "geo.json")
+)
+GEO_CACHE_SIZE = int(os.getenv("GEO_CACHE_SIZE", 10000))
+GEO_CACHE_TTL = float(os.getenv("GEO_CACHE_TTL", 7 * 86400))
+GEO_TIMEOUT = 5
+# Background lookups share this many threads; a burst of new IPs queues.
+GEO_FETCH_WORKERS = int(os.getenv("GEO_FETCH_WORKERS", 2))
+# The cache file is rewritten at most this often (and once at exit).
+GEO_SAVE_INTERVAL = float(os.getenv("GEO_SAVE_INTERVAL", 60))
+# Cache keys for "this machine", whose public IP only the remote side knows.
+# The network can change under a laptop at any time, so these live in memory
+# only, for GEO_SELF_TTL seconds; the IP they resolve to is cached as usual.
+SELF = "self"
+SELF_IP = "self-ip"
+GEO_SELF_TTL = float(os.getenv("GEO_SELF_TTL", 300))
+
+logger = logging.getLogger(__name__)
+
+
+class StubProvider:
+    """Fixed answer for every IP; never touches the network."""
+
+    def __init__(self, latitude="Unknown", longitude="Unknown", ip=None):
+        self.location = (latitude, longitude)
+        self.ip = ip
+
+    def locate(self, ip=None):
+        return (ip or self.ip), self.location
+
+
+class IpinfoProvider:
+    """ipinfo.io lookup; ip=None asks about this machine's public IP."""
+
+    def __init__(self, timeout=GEO_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def locate(self, ip=None):
+        url = f"https://ipinfo.io/{ip}/json" if ip else "https://ipinfo.io/json"
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        loc = data.get("loc")
+        return data.get("ip", ip), tuple(loc.split(",")) if loc else UNKNOWN
+
+
+class OfflineProvider:
+    """Local IP-range database, looked up with bisect.
+
+    CSV rows start with the range (first, last address; dotted or integer
+    form) and end with latitude, longitude, so IP2Location-style DB5 files
+    load as-is. Ranges must not overlap.
+    """
+
+    def __init__(self, path):
+        ranges = []
+        with open(path, newline="") as file:
+            for row in csv.reader(file):
+                try:
+                    start, end = _address(row[0]), _address(row[1])
+                    latitude, longitude = float(row[-2]), float(row[-1])
+                except (IndexError, ValueError):
+                    continue  # header or malformed line
+                ranges.append((start, end, f"{latitude:.4f}", f"{longitude:.4f}"))
+        ranges.sort()
+        self.starts = [start for start, *_ in ranges]
+        self.ranges = ranges
+
+    def locate(self, ip=None):
+        if ip is None:
+            return None, UNKNOWN
+        try:
+            address = _address(ip)
+        except ValueError:
+            return ip, UNKNOWN
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index >= 0 and address <= self.ranges[index][1]:
+            return ip, self.ranges[index][2:]
+        return ip, UNKNOWN
+
+
+def _address(value):
+    value = value.strip()
+    return int(value) if value.isdigit() else int(ipaddress.ip_address(value))
+
+
+class GeoCache:
+    """LRU of ip -> (latitude, longitude, expires), saved as JSON.
+    Keys in `volatile` (this machine's) are never written to disk."""
+
+    volatile = frozenset({SELF, SELF_IP})
+
+    def __init__(self, path=GEO_CACHE_PATH, size=GEO_CACHE_SIZE, ttl=GEO_CACHE_TTL):
+        self.path = Path(path) if path else None
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.load()
+        if self.path:
+            atexit.register(self.flush)
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            stored = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self.lock:
+            for key, entry in stored.items():
+                if entry[-1] > now and key not in self.volatile:
+                    self.entries[key] = tuple(entry)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = json.dumps(
+                {k: e for k, e in self.entries.items() if k not in self.volatile}
+            )
+            self.dirty = False
+            self.saved_at = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(
+                f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            temporary.write_text(data)
+            temporary.replace(self.path)
+        except OSError as e:
+            print(red + f"Could not save the location cache: {e}" + reset)
+
+    def save_soon(self):
+        # Batches writes: new entries reach disk within GEO_SAVE_INTERVAL.
+        with self.lock:
+            self.dirty = True
+            due = time.monotonic() - self.saved_at >= GEO_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[-1] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[:-1]
+
+    def put(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (*value, time.time() + (ttl or self.ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+class Geolocator:
+    def __init__(self, remote, offline=None, cache=None):
+        self.remote = remote
+        self.offline = offline
+        self.cache = cache if cache is not None else GeoCache()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(
+            max_workers=GEO_FETCH_WORKERS, thread_name_prefix="geo"
+        )
+
+    def locate(self, ip=None):
+        # Never blocks on the remote provider: cache, then offline database,
+        # else UNKNOWN while a background fetch fills the cache.
+        location = self.cache.get(ip or SELF)
+        if location is not None:
+            return location
+        if self.offline is not None:
+            _, location = self.offline.locate(ip or self._self_ip())
+            if location != UNKNOWN:
+                return location
+        self.prefetch(ip)
+        return UNKNOWN
+
+    def _self_ip(self):
+        ip = self.cache.get(SELF_IP)
+        return ip[0] if ip else None
+
+    def prefetch(self, ip=None):
+        key = ip or SELF
+        with self.lock:
+            if key in self.pending or self.remote is None:
+                return
+            self.pending.add(key)
+        self.pool.submit(self._fetch, ip)
+
+    def _fetch(self, ip):
+        key = ip or SELF
+        try:
+            resolved, location = self.remote.locate(ip)
+            if ip is None:
+                self.cache.put(SELF, location, GEO_SELF_TTL)
+                if resolved:
+                    self.cache.put(SELF_IP, (resolved,), GEO_SELF_TTL)
+            else:
+                self.cache.put(ip, location)
+            if resolved:
+                self.cache.put(resolved, location)
+            self.cache.save_soon()
+        except (requests.RequestException, ValueError) as e:
+            # Runs behind a login prompt, so keep the terminal quiet.
+            logger.debug(f"Error fetching location: {e}")
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+
+
+_geolocator = {"instance": None}
+_geolocator_lock = threading.Lock()
+
+
+def _from_env():
+    name = os.getenv("GEO_PROVIDER", "ipinfo")
+    db_path = os.getenv("GEO_DB_PATH")
+    offline = OfflineProvider(db_path) if db_path else None
+    if name == "stub":
+        # Answers synchronously: the stub stands in for the offline database.
+        stub = StubProvider(
+            *os.getenv("GEO_STUB_LOCATION", "Unknown,Unknown").split(",")
+        )
+        return Geolocator(None, stub, cache=GeoCache(path=None))
+    remote = None if name == "offline" else IpinfoProvider()
+    return Geolocator(remote, offline)
+
+
+def get_geolocator():
+    with _geolocator_lock:
+        if _geolocator["instance"] is None:
+            _geolocator["instance"] = _from_env()
+        return _geolocator["instance"]
+
+
+def set_geolocator(geolocator):
+    # Swap the process-wide geolocator, e.g. a stub in tests.
+    with _geolocator_lock:
+        _geolocator["instance"] = geolocator
+
+
+def locate(ip=None):
+    return get_geolocator().locate(ip)
@@ -0,0 +1,108 @@
+# Password hashing service: bcrypt on a bounded thread pool.
+# bcrypt releases the GIL, so a burst of logins hashes in parallel up to
+# HASH_WORKERS at a time and queues beyond that instead of starving the
+# threads serving everything else. Sync and async APIs share the pool.
+import os
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+import bcrypt
+from utils.helpers import green, reset
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Work factor is calibrated so one hash takes about this long on this host,
+# but never drops below MIN_COST (the bcrypt default existing hashes use).
+TARGET_HASH_MS = float(os.getenv("BCRYPT_TARGET_MS", 250))
+MIN_COST = int(os.getenv("BCRYPT_MIN_COST", 12))
+MAX_COST = int(os.getenv("BCRYPT_MAX_COST", 16))
+# Cost the calibration times; each step above it doubles the work.
+PROBE_COST = 8
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_cost = None
+_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=HASH_WORKERS, thread_name_prefix="bcrypt"
+                )
+    return _pool
+
+
+def calibrate_cost(target_ms=TARGET_HASH_MS):
+    # Highest cost whose estimated hash time fits target_ms.
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(PROBE_COST))
+    probe_ms = (time.perf_counter() - started) * 1000
+    cost = PROBE_COST
+    while cost < MAX_COST and probe_ms * 2 ** (cost + 1 - PROBE_COST) <= target_ms:
+        cost += 1
+    return max(MIN_COST, cost)
+
+
+def current_cost():
+    # BCRYPT_COST pins the work factor; otherwise calibrate once per process.
+    global _cost
+    if _cost is None:
+        with _lock:
+            if _cost is None:
+                pinned = os.getenv("BCRYPT_COST")
+                _cost = int(pinned) if pinned else calibrate_cost()
+                logger.info(green + f"bcrypt cost set to {_cost}" + reset)
+    return _cost
+
+
+def hash_cost(hashed: str) -> int:
+    # "$2b$12$..." -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed: str) -> bool:
+    return hash_cost(hashed) < current_cost()
+
+
+def _hash(password: str, cost: int) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(cost)).decode()
+
+
+def _check(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        # Malformed or missing hash in the database.
+        return False
+
+
+def hash_password(password: str) -> str:
+    return _executor().submit(_hash, password, current_cost()).result()
+
+
+def hash_passwords(passwords, cost=None) -> list:
+    # Whole batch across the pool at once, results in input order.
+    return list(_executor().map(_hash, passwords, repeat(cost or current_cost())))
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return _executor().submit(_check, password, hashed).result()
+
+
+async def hash_password_async(password: str) -> str:
+    cost = current_cost()
+    return await asyncio.wrap_future(_executor().submit(_hash, password, cost))
+
+
+async def check_password_async(password: str, hashed: str) -> bool:
+    return await asyncio.wrap_future(_executor().submit(_check, password, hashed))
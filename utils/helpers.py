@@ -1,5 +1,5 @@
 # Helper functions (frequent use)
-import os, time
+import os, sys, time
 from datetime import datetime
 from colorama import Fore, Style
 
@@ -9,12 +9,63 @@ yellow = Fore.YELLOW
 red = Fore.RED
 green = Fore.GREEN
 
+# Terminal I/O. Headless mode (set_headless() or BLACKJACK_HEADLESS=1) skips
+# every artificial delay and screen clear, and can read scripted input.
+# All output goes to sys.stdout, plain print() calls included, so capture a
+# headless session with contextlib.redirect_stdout:
+#   with redirect_stdout(buffer):
+#       set_headless(["1", "player@example.com", ...])
+#       main()
+_terminal = {
+    "headless": os.getenv("BLACKJACK_HEADLESS") == "1",
+    "input": None,  # callable(prompt) -> str, None for the built-in input()
+}
+
+
+def set_headless(inputs=None):
+    # inputs: a callable(prompt) or an iterable of answers, in order.
+    if inputs is not None and not callable(inputs):
+        answers = iter(inputs)
+
+        def scripted(prompt=""):
+            try:
+                return next(answers)
+            except StopIteration:
+                raise EOFError("Scripted input exhausted")
+
+        inputs = scripted
+
+    _terminal.update(headless=True, input=inputs)
+
+
+def set_interactive():
+    _terminal.update(headless=False, input=None)
+
+
+def is_headless():
+    return _terminal["headless"]
+
+
+def write(text="", end="\n"):
+    print(text, end=end, flush=True)
+
+
+def read_input(prompt=""):
+    source = _terminal["input"]
+    if source is None:
+        return input(prompt)
+    write(prompt, end="")
+    return source(prompt)
+
 
 def sleep(delay=0.35):
-    time.sleep(delay)
+    if not _terminal["headless"]:
+        time.sleep(delay)
 
 
 def clear():
+    if _terminal["headless"]:
+        return
     sleep()
     os.system("cls" if os.name == "nt" else "clear")
 
@@ -29,6 +80,9 @@ def typing_effect(*message, delay=0.03):
 
     # Use .join for type-writer effect.
     message = "".join(message)
+    if _terminal["headless"]:
+        write(message)
+        return
     for char in message:
         print(char, end="", flush=True)
         time.sleep(delay)
@@ -37,9 +91,9 @@ def typing_effect(*message, delay=0.03):
 
 def input_quit_handle(prompt, reset=Style.RESET_ALL):
     # Print in color
-    print(prompt, reset, end="", flush=True)
+    write(f"{prompt} {reset}", end="")
     # Type in 'normal', color.
-    user_input = input().strip().lower()
+    user_input = read_input().strip().lower()
 
     if user_input in {"q", "quit"}:
         handle_quit()
@@ -58,7 +112,23 @@ def normalize_system_info(info):
     normalized["drives"] = sorted(
         normalized.get("drives", []), key=lambda d: d.get("serial", "")
     )
-    # Convert latitude and longitude to rounded floats
-    normalized["latitude"] = round(float(normalized.get("latitude", "0")), 4)
-    normalized["longitude"] = round(float(normalized.get("longitude", "0")), 4)
+    # Convert latitude and longitude to rounded floats ("Unknown" stays as is)
+    for key in ("latitude", "longitude"):
+        try:
+            normalized[key] = round(float(normalized.get(key, "0")), 4)
+        except ValueError:
+            pass
     return normalized
+
+
+def system_info_matches(current, stored):
+    # Fingerprint comparison. An "Unknown" location on either side (lookup
+    # still running in the background, or offline) matches any location.
+    current = normalize_system_info(current)
+    stored = normalize_system_info(stored)
+    location = ("latitude", "longitude")
+    if "Unknown" in [info.get(key) for info in (current, stored) for key in location]:
+        for key in location:
+            current.pop(key, None)
+            stored.pop(key, None)
+    return current == stored
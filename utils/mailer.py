@@ -0,0 +1,213 @@
+# Outbound mail queue: callers enqueue and return at once, a few worker
+# threads deliver over SMTP connections they keep logged in between sends.
+# Offline testing: python -m utils.smtp_sink, then SMTP_HOST=localhost
+# SMTP_PORT=1025 SMTP_SSL=0.
+import atexit
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from utils.helpers import green, red, reset
+
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", 2))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 20))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_BACKOFF_SECONDS = float(os.getenv("MAIL_BACKOFF_SECONDS", 2))
+# Connections idle this long are closed; servers drop them anyway.
+MAIL_IDLE_SECONDS = float(os.getenv("MAIL_IDLE_SECONDS", 60))
+SMTP_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+
+def smtp_settings():
+    return {
+        "host": os.getenv("SMTP_HOST"),
+        "port": int(os.getenv("SMTP_PORT") or 465),
+        "user": os.getenv("SMTP_USER"),
+        "password": os.getenv("SMTP_PASS"),
+        "ssl": os.getenv("SMTP_SSL", "1") != "0",
+    }
+
+
+def build_message(sender, to_email, subject, body):
+    message = MIMEMultipart()
+    message["From"] = sender
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "html"))
+    return message.as_string()
+
+
+class MailQueue:
+    def __init__(
+        self,
+        workers=MAIL_WORKERS,
+        batch_size=MAIL_BATCH_SIZE,
+        max_attempts=MAIL_MAX_ATTEMPTS,
+        backoff=MAIL_BACKOFF_SECONDS,
+        settings=None,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.settings = settings or smtp_settings()
+        self.queue = queue.Queue()
+        self.counters = {"sent": 0, "failed": 0, "retried": 0, "in_flight": 0}
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def _count(self, name, delta=1):
+        with self.lock:
+            self.counters[name] += delta
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"mailer-{number}", daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def enqueue(self, to_email, subject, body):
+        # Returns as soon as the message is queued.
+        self.start()
+        sender = self.settings["user"] or os.getenv("MAIL_FROM", "blackjack@localhost")
+        message = {
+            "sender": sender,
+            "to": to_email,
+            "data": build_message(sender, to_email, subject, body),
+            "attempts": 0,
+        }
+        self.queue.put(message)
+
+    def stats(self):
+        # Queue depth and delivery counters, for logs or a metrics endpoint.
+        with self.lock:
+            return {"queued": self.queue.qsize(), **self.counters}
+
+    def flush(self, timeout=None):
+        # Waits until everything queued so far was delivered or gave up.
+        # Retries waiting on their backoff count as pending.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                idle = (
+                    not self.queue.unfinished_tasks and not self.counters["in_flight"]
+                )
+            if idle:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def _connect(self):
+        settings = self.settings
+        smtp_class = smtplib.SMTP_SSL if settings["ssl"] else smtplib.SMTP
+        server = smtp_class(settings["host"], settings["port"], timeout=SMTP_TIMEOUT)
+        if settings["user"]:
+            server.login(settings["user"], settings["password"])
+        return server
+
+    def _next_batch(self, server):
+        # Blocks for the first message, then takes whatever else is waiting.
+        try:
+            batch = [self.queue.get(timeout=MAIL_IDLE_SECONDS if server else None)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        server = None
+        while True:
+            batch = self._next_batch(server)
+            if not batch:
+                # Idle: let the connection go until there is mail again.
+                server = self._close(server)
+                continue
+            self._count("in_flight", len(batch))
+            for message in batch:
+                try:
+                    if server is None:
+                        server = self._connect()
+                    server.sendmail(message["sender"], message["to"], message["data"])
+                    self._count("sent")
+                except (smtplib.SMTPException, OSError) as e:
+                    server = self._close(server)
+                    self._retry(message, e)
+                except Exception as e:
+                    # A malformed message (bad address, unencodable data)
+                    # fails the same way every time: drop it, keep the worker.
+                    server = self._close(server)
+                    self._count("failed")
+                    logger.exception(
+                        red + f"Dropping mail to {message['to']}: {e!r}" + reset
+                    )
+                finally:
+                    self._count("in_flight", -1)
+                    self.queue.task_done()
+
+    def _close(self, server):
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        return None
+
+    def _retry(self, message, error):
+        message["attempts"] += 1
+        if message["attempts"] >= self.max_attempts:
+            self._count("failed")
+            logger.error(red + f"Giving up on mail to {message['to']}: {error}" + reset)
+            return
+        # Exponential backoff; the message is pending (in flight) until requeued.
+        self._count("retried")
+        self._count("in_flight")
+        delay = self.backoff * 2 ** (message["attempts"] - 1)
+        timer = threading.Timer(delay, self._requeue, (message,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, message):
+        self.queue.put(message)
+        self._count("in_flight", -1)
+
+
+_mailer = {"queue": None}
+_mailer_lock = threading.Lock()
+
+
+def get_mailer():
+    with _mailer_lock:
+        if _mailer["queue"] is None:
+            _mailer["queue"] = MailQueue()
+        return _mailer["queue"]
+
+
+def send_mail(to_email, subject, body):
+    get_mailer().enqueue(to_email, subject, body)
+
+
+def _drain_at_exit():
+    mailer = _mailer["queue"]
+    if mailer is not None and not mailer.flush(timeout=10):
+        logger.warning(f"Mail still queued at exit: {mailer.stats()}")
+    elif mailer is not None:
+        logger.info(green + f"Mail queue drained: {mailer.stats()}" + reset)
+
+
+atexit.register(_drain_at_exit)
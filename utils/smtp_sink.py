@@ -0,0 +1,112 @@
+# Local SMTP sink for offline testing: accepts any login and any message,
+# prints a summary and optionally saves each one as a .eml file.
+#   python -m utils.smtp_sink --port 1025 --out data/mail
+#   SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SSL=0 python main.py
+import argparse
+import asyncio
+import sys
+import time
+from email import message_from_bytes
+from pathlib import Path
+from utils.helpers import green, blue, reset
+
+
+class SmtpSink:
+    def __init__(self, out=None):
+        self.out = Path(out) if out else None
+        self.received = []
+
+    def deliver(self, sender, recipients, data):
+        message = message_from_bytes(data)
+        self.received.append((sender, recipients, message))
+        print(
+            blue
+            + f"Mail from {sender} to {', '.join(recipients)}: {message['Subject']}"
+            + reset
+        )
+        if self.out:
+            self.out.mkdir(parents=True, exist_ok=True)
+            name = f"{time.time_ns()}-{len(self.received)}.eml"
+            (self.out / name).write_bytes(data)
+
+    async def handle(self, reader, writer):
+        def reply(line):
+            writer.write(f"{line}\r\n".encode())
+
+        sender, recipients = None, []
+        reply("220 blackjack smtp sink")
+        while line := await reader.readline():
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                reply("250-localhost" if verb == "EHLO" else "250 localhost")
+                if verb == "EHLO":
+                    reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                # Any credentials will do; LOGIN asks for them one at a time.
+                if command.upper().startswith("AUTH LOGIN"):
+                    for prompt in ("VXNlcm5hbWU6", "UGFzc3dvcmQ6")[
+                        len(command.split()) - 2 :
+                    ]:
+                        reply(f"334 {prompt}")
+                        await writer.drain()
+                        await reader.readline()
+                elif len(command.split()) == 2:
+                    reply("334 ")
+                    await writer.drain()
+                    await reader.readline()
+                reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(" <>"), []
+                reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                reply("250 OK")
+            elif verb == "DATA":
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                await writer.drain()
+                lines = []
+                while (line := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                    # Undo dot-stuffing.
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                self.deliver(sender, recipients, b"".join(lines))
+                reply("250 OK")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                reply("250 OK")
+            elif verb == "NOOP":
+                reply("250 OK")
+            elif verb == "QUIT":
+                reply("221 Bye")
+                break
+            else:
+                reply("502 Command not implemented")
+            await writer.drain()
+        writer.close()
+
+    async def serve(self, host="127.0.0.1", port=1025):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(green + f"SMTP sink listening on {host}:{port}" + reset)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.smtp_sink",
+        description="Accept mail locally instead of sending it.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--out", type=Path, help="save each message here as .eml")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(SmtpSink(args.out).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
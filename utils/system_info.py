@@ -0,0 +1,155 @@
+# Hardware fingerprint and location used to recognise a login's machine.
+# On Linux everything comes straight from sysfs (no subprocesses); the
+# probes run concurrently and the result is cached per process. The
+# location never blocks: see utils.geolocation.
+import copy
+import glob
+import os
+import platform
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.geolocation import locate
+from utils.helpers import red, reset
+
+SYSTEM_INFO_TTL = float(os.getenv("SYSTEM_INFO_TTL", 300))
+# Bumped whenever the probes change what they report. Version 2 reads sysfs:
+# full MAC addresses (version 1 stored regex fragments) and udev serials.
+# Version 3 keeps only the MACs of physical NICs.
+# Stored fingerprints from an older version are re-baselined on the next
+# verified login instead of being compared (see fingerprint_outdated).
+FINGERPRINT_VERSION = 3
+_MAC = re.compile(r"([0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}")
+_EMPTY_MAC = "00:00:00:00:00:00"
+
+_cache = {"info": None, "expires": 0.0}
+_cache_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return ""
+
+
+def _run(command):
+    return subprocess.check_output(command, text=True, stderr=subprocess.DEVNULL)
+
+
+def mac_addresses():
+    if platform.system() == "Windows":
+        output = _run(
+            [
+                "powershell",
+                "-Command",
+                "Get-NetAdapter | Select-Object -ExpandProperty MacAddress",
+            ]
+        )
+        macs = [mac.replace("-", ":").strip() for mac in output.splitlines()]
+        return [mac for mac in macs if _stable_mac(mac)]
+
+    # Physical NICs only: virtual ones (veth, docker0, bridges) have no
+    # device link and get new addresses whenever containers restart.
+    interfaces = glob.glob("/sys/class/net/*")
+    macs = {
+        _read(f"{interface}/address")
+        for interface in interfaces
+        if os.path.exists(f"{interface}/device")
+    }
+    if not interfaces:
+        # No sysfs (macOS, BSD): parse ifconfig instead.
+        macs = {match.group(0) for match in _MAC.finditer(_run(["ifconfig"]))}
+    return sorted(mac.lower() for mac in macs if _stable_mac(mac))
+
+
+def _stable_mac(mac):
+    # Skips empty, all-zero and locally administered (randomised or
+    # virtual) addresses, which do not identify the hardware.
+    if not mac or mac == _EMPTY_MAC:
+        return False
+    return not int(mac.replace("-", ":").split(":")[0], 16) & 0b10
+
+
+def _disk_serial(block):
+    # udev's database is where lsblk gets SERIAL from; sysfs as a fallback.
+    dev = _read(f"{block}/dev")
+    for line in _read(f"/run/udev/data/b{dev}").splitlines() if dev else []:
+        if line.startswith("E:ID_SERIAL_SHORT="):
+            return line.split("=", 1)[1]
+    return _read(f"{block}/device/serial") or _read(f"{block}/serial")
+
+
+def drives():
+    if platform.system() == "Windows":
+        output = _run(["wmic", "diskdrive", "get", "SerialNumber,Model"])
+        found = []
+        for line in output.splitlines()[1:]:
+            if line.strip():
+                model, serial = line.strip().rsplit(None, 1)
+                found.append({"model": model, "serial": serial})
+        return found
+
+    # Same shape as the old lsblk NAME,SERIAL parse: disks with a serial.
+    found = []
+    for block in sorted(glob.glob("/sys/block/*")):
+        serial = _disk_serial(block)
+        if serial:
+            found.append({"model": os.path.basename(block), "serial": serial})
+    return found
+
+
+def motherboard_serial():
+    if platform.system() == "Windows":
+        output = _run(["wmic", "baseboard", "get", "serialnumber"])
+        return output.split("\n")[1].strip()
+    # board_serial is root-only on most distributions.
+    return _read("/sys/class/dmi/id/board_serial") or "Unknown"
+
+
+PROBES = {
+    "mac_addresses": (mac_addresses, []),
+    "drives": (drives, []),
+    "motherboard_serial": (motherboard_serial, "Unknown"),
+}
+
+
+def collect_system_info():
+    # Every probe at once; a failing probe falls back to its default.
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(PROBES)) as pool:
+        futures = {name: pool.submit(probe) for name, (probe, _) in PROBES.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(red + f"Error fetching {name.replace('_', ' ')}: {e}" + reset)
+                results[name] = PROBES[name][1]
+    return results
+
+
+def get_system_info(refresh=False):
+    # Hardware is cached for SYSTEM_INFO_TTL seconds; callers get their own
+    # copy. The location is looked up every time, as it may have resolved
+    # in the background since.
+    with _cache_lock:
+        if refresh or _cache["info"] is None or time.monotonic() >= _cache["expires"]:
+            _cache["info"] = collect_system_info()
+            _cache["expires"] = time.monotonic() + SYSTEM_INFO_TTL
+        info = copy.deepcopy(_cache["info"])
+    latitude, longitude = locate()
+    return {
+        **info,
+        "latitude": latitude,
+        "longitude": longitude,
+        "fingerprint_version": FINGERPRINT_VERSION,
+    }
+
+
+def fingerprint_outdated(stored):
+    # True for a fingerprint collected by older probes, which can never
+    # match what the current ones report.
+    return stored.get("fingerprint_version", 1) < FINGERPRINT_VERSION
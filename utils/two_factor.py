@@ -0,0 +1,285 @@
+# Server-side 2FA codes: issue_code() stores a code for an account and
+# returns it for mailing, verify_code() checks an attempt against it. Codes
+# never leave the server except by email; each expires after TWO_FA_TTL
+# seconds, and TWO_FA_MAX_ATTEMPTS wrong guesses lock the account out of
+# 2FA for TWO_FA_LOCK_SECONDS.
+# The store is an in-process dict by default; set TWO_FA_REDIS_URL to share
+# codes between several backend processes (needs the redis package).
+# Login flows go through get_two_factor(). TWO_FA_BACKEND=http (default)
+# asks the Flask backend at TWO_FA_URL, which owns the code store. =direct
+# issues, mails and checks codes in the client's own process instead; only
+# set it when that process can reach the same store as the backend (a
+# single-host install, or a shared TWO_FA_REDIS_URL), since nothing here
+# can tell whether it does.
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils.mailer import send_mail
+
+TWO_FA_TTL = int(os.getenv("TWO_FA_TTL", 300))
+TWO_FA_MAX_ATTEMPTS = int(os.getenv("TWO_FA_MAX_ATTEMPTS", 5))
+# Wrong guesses count against the account for this long, across new codes.
+TWO_FA_LOCK_SECONDS = int(os.getenv("TWO_FA_LOCK_SECONDS", 900))
+LOCKED_REASON = "Too many wrong codes, try again later"
+TWO_FA_BACKEND = os.getenv("TWO_FA_BACKEND", "http")
+TWO_FA_URL = os.getenv("TWO_FA_URL", "http://127.0.0.1:5000")
+# (connect, read) seconds; sending only queues the mail, so both are short.
+TWO_FA_TIMEOUT = (3, 10)
+
+
+class TwoFactorError(Exception):
+    pass
+
+
+def _digest(code):
+    # Stores only hold a hash of the code.
+    return hashlib.sha256(str(code).strip().encode()).hexdigest()
+
+
+class MemoryCodeStore:
+    """Per-process codes (key -> [digest, expires]) and failure counters
+    (key -> [count, expires]), both behind one lock."""
+
+    def __init__(self):
+        self.codes = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def _live(self, table, key, now):
+        entry = table.get(key)
+        if entry is not None and entry[1] <= now:
+            del table[key]
+            entry = None
+        return entry
+
+    def put(self, key, digest, ttl):
+        now = time.monotonic()
+        with self.lock:
+            # Expired entries are only cleaned up here, so the dicts stay small.
+            for table in (self.codes, self.failures):
+                for stale in [k for k, e in table.items() if e[1] <= now]:
+                    del table[stale]
+            self.codes[key] = [digest, now + ttl]
+
+    def failed(self, key):
+        with self.lock:
+            entry = self._live(self.failures, key, time.monotonic())
+            return entry[0] if entry else 0
+
+    def check(self, key, digest, max_attempts, window):
+        # Compare, count and consume in one step; see RedisCodeStore.check.
+        now = time.monotonic()
+        with self.lock:
+            failures = self._live(self.failures, key, now)
+            if failures and failures[0] >= max_attempts:
+                self.codes.pop(key, None)
+                return "locked"
+            code = self._live(self.codes, key, now)
+            if code is None:
+                return "missing"
+            if hmac.compare_digest(code[0], digest):
+                del self.codes[key]
+                self.failures.pop(key, None)
+                return "verified"
+            if failures is None:
+                failures = self.failures[key] = [0, now + window]
+            failures[0] += 1
+            if failures[0] >= max_attempts:
+                del self.codes[key]
+                return "locked"
+            return "invalid"
+
+
+# KEYS: code, failures. ARGV: digest, max attempts, failure window.
+# Runs atomically on the server, so two requests cannot both consume the
+# same code and the failure counter never exists without its TTL. The
+# digests compared are hashes of the code, so the plain == leaks nothing.
+_CHECK_SCRIPT = """
+local max = tonumber(ARGV[2])
+if tonumber(redis.call('GET', KEYS[2]) or '0') >= max then
+    redis.call('DEL', KEYS[1])
+    return 'locked'
+end
+local digest = redis.call('GET', KEYS[1])
+if not digest then
+    return 'missing'
+end
+if digest == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 'verified'
+end
+local failures = redis.call('INCR', KEYS[2])
+if failures == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+if failures >= max then
+    redis.call('DEL', KEYS[1])
+    return 'locked'
+end
+return 'invalid'
+"""
+
+
+class RedisCodeStore:
+    """Same store on any Redis-compatible server: <prefix><key> holds the
+    code digest, <prefix>fail:<key> the failure counter."""
+
+    def __init__(self, client, prefix="2fa:"):
+        self.client = client
+        self.prefix = prefix
+        self.script = client.register_script(_CHECK_SCRIPT)
+
+    def put(self, key, digest, ttl):
+        self.client.set(self.prefix + key, digest, ex=ttl)
+
+    def failed(self, key):
+        return int(self.client.get(f"{self.prefix}fail:{key}") or 0)
+
+    def check(self, key, digest, max_attempts, window):
+        status = self.script(
+            keys=[self.prefix + key, f"{self.prefix}fail:{key}"],
+            args=[digest, max_attempts, window],
+        )
+        return status.decode() if isinstance(status, bytes) else status
+
+
+_store = {"instance": None}
+_store_lock = threading.Lock()
+
+
+def _from_env():
+    url = os.getenv("TWO_FA_REDIS_URL")
+    if not url:
+        return MemoryCodeStore()
+    import redis
+
+    return RedisCodeStore(redis.Redis.from_url(url))
+
+
+def get_code_store():
+    with _store_lock:
+        if _store["instance"] is None:
+            _store["instance"] = _from_env()
+        return _store["instance"]
+
+
+def set_code_store(store):
+    # Swap the process-wide store, e.g. a fresh MemoryCodeStore in tests.
+    with _store_lock:
+        _store["instance"] = store
+
+
+def _key(account):
+    return account.strip().lower()
+
+
+def issue_code(account, ttl=TWO_FA_TTL):
+    # New code for the account, replacing any earlier one. Wrong guesses
+    # are counted per account, not per code, so asking for a fresh code
+    # does not buy more guesses.
+    key = _key(account)
+    store = get_code_store()
+    if store.failed(key) >= TWO_FA_MAX_ATTEMPTS:
+        raise TwoFactorError(LOCKED_REASON)
+    code = f"{secrets.randbelow(900000) + 100000}"
+    store.put(key, _digest(code), ttl)
+    return code
+
+
+VERIFY_REASONS = {
+    "verified": "2FA code verified",
+    "missing": "No valid 2FA code, request a new one",
+    "invalid": "Invalid 2FA code",
+}
+
+
+def verify_code(account, code):
+    # Returns (ok, reason). A correct code is used up.
+    status = get_code_store().check(
+        _key(account), _digest(code), TWO_FA_MAX_ATTEMPTS, TWO_FA_LOCK_SECONDS
+    )
+    return status == "verified", VERIFY_REASONS.get(status, LOCKED_REASON)
+
+
+TWO_FA_SUBJECT = "Your 2FA Code"
+TWO_FA_BODY = "Your 2FA code is {code}. Please enter it to complete the login process."
+
+
+def send_code(account):
+    # Issue a code and queue the mail carrying it. The only place a code is
+    # mailed: /send-2fa and DirectTwoFactor both come through here.
+    code = issue_code(account)
+    send_mail(account, TWO_FA_SUBJECT, TWO_FA_BODY.format(code=code))
+
+
+class DirectTwoFactor:
+    """Issues and checks codes in this process: no HTTP hop at all. Opt-in
+    (TWO_FA_BACKEND=direct), for clients that share the backend's store."""
+
+    def send(self, email):
+        send_code(email)
+
+    def verify(self, email, code):
+        ok, reason = verify_code(email, code)
+        if not ok:
+            raise TwoFactorError(reason)
+
+
+class HttpTwoFactor:
+    """Talks to the Flask backend over one pooled keep-alive session."""
+
+    def __init__(self, base_url=TWO_FA_URL, timeout=TWO_FA_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path, payload):
+        try:
+            response = self.session.post(
+                f"{self.base_url}{path}", json=payload, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise TwoFactorError(f"{e} (is the backend running?)") from e
+        if not response.ok:
+            # Wrong, expired or used-up code: pass the backend's reason on.
+            try:
+                message = response.json().get("message")
+            except ValueError:
+                message = None
+            raise TwoFactorError(message or f"HTTP {response.status_code}")
+
+    def send(self, email):
+        self._post("/send-2fa", {"email": email})
+
+    def verify(self, email, code):
+        self._post("/verify-2fa", {"email": email, "code": code})
+
+
+_service = {"instance": None}
+
+
+def get_two_factor():
+    with _store_lock:
+        if _service["instance"] is None:
+            if TWO_FA_BACKEND == "direct":
+                _service["instance"] = DirectTwoFactor()
+            elif TWO_FA_BACKEND == "http":
+                _service["instance"] = HttpTwoFactor()
+            else:
+                raise ValueError(
+                    f"TWO_FA_BACKEND must be 'http' or 'direct', not {TWO_FA_BACKEND!r}"
+                )
+        return _service["instance"]
+
+
+def set_two_factor(service):
+    with _store_lock:
+        _service["instance"] = service